@@ -134,10 +134,6 @@ def calculate_all_metrics():
         from src.physics_validation import PhysicsValidator
         validator = PhysicsValidator()
         
-        # Calculate UHI intensity
-        reference_temp = np.mean(data['true_2d'])
-        uhi_intensity = data['prithvi_2d'] - reference_temp
-        
         # Calculate NDBI (simplified)
         ndbi = validator.calculate_ndbi(
             data['prithvi_2d'] / 50,  # Normalize for NDBI calculation
@@ -147,8 +143,7 @@ def calculate_all_metrics():
         physics_validation = validator.comprehensive_validation(
             data['prithvi_2d'],
             data['ndvi'],
-            ndbi=ndbi,
-            reference_temp=reference_temp
+            ndbi=ndbi
         )
         results['physics_validation'] = physics_validation
         print(f"   ✅ UHI-NDVI correlation: {physics_validation['uhi_ndvi'].get('correlation', 'N/A')}")
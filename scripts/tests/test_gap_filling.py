@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Test script for Gap Filling Algorithm (Day 2)
-Tests Random Forest gap filling on NDVI data
+Tests gradient boosting gap filling on NDVI data
 """
 
 import sys
@@ -29,7 +29,7 @@ def test_gap_filling():
         # Test 1: Initialize gap filler
         print("\n[Test 1] Initializing gap filler...")
         gap_filler = NDVIGapFiller(
-            n_estimators=10,  # Reduced for faster testing
+            max_iter=10,  # Reduced for faster testing
             max_depth=10,
             random_state=42
         )
@@ -55,7 +55,7 @@ def test_gap_filling():
         features, missing_mask = gap_filler.extract_features(ndvi_with_gaps, window_size=5)
         assert features is not None, "Failed to extract features"
         assert len(features) > 0, "No features extracted"
-        assert features.shape[1] == 16, f"Expected 16 features, got {features.shape[1]}"
+        assert features.shape[1] == 31, f"Expected 31 features, got {features.shape[1]}"
         print(f"✅ Extracted {len(features)} feature vectors with {features.shape[1]} features each")
         
         # Test 4: Extract training data
@@ -68,7 +68,7 @@ def test_gap_filling():
         print(f"✅ Extracted {len(X_train)} training samples")
         
         # Test 5: Train model
-        print("\n[Test 5] Training Random Forest model...")
+        print("\n[Test 5] Training gradient boosting model...")
         metrics = gap_filler.train(ndvi_arrays, test_size=0.2, window_size=5)
         assert gap_filler.is_fitted, "Model should be fitted after training"
         assert metrics is not None, "Training should return metrics"
@@ -28,7 +28,7 @@ def test_gap_filling_structure():
             "extract_features method": "def extract_features" in code,
             "train method": "def train" in code,
             "fill_gaps method": "def fill_gaps" in code,
-            "RandomForestRegressor": "RandomForestRegressor" in code,
+            "HistGradientBoostingRegressor": "HistGradientBoostingRegressor" in code,
         }
         
         all_passed = True
@@ -5,9 +5,7 @@ Computes metrics comparing model outputs to ground truth.
 Phase 1: Placeholder metrics only (no real evaluation)
 """
 
-import json
 import logging
-from pathlib import Path
 from typing import Dict, Any
 
 from src.models import Manifest, Metrics
@@ -48,12 +46,12 @@ def evaluate_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     
     # Save metrics
     if manifest.paths and manifest.paths.exports:
-        exports_dir = Path(manifest.paths.exports.replace("gs://", "/tmp/gcs/"))
+        exports_dir = manifest.paths.local_exports
         exports_dir.mkdir(parents=True, exist_ok=True)
         
         metrics_path = exports_dir / "metrics.json"
         with open(metrics_path, 'w') as f:
-            json.dump(metrics.to_json(), f, indent=2)
+            f.write(metrics.model_dump_json(indent=2))
         
         logger.info(f"✅ Metrics saved: {metrics_path}")
     
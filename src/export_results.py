@@ -12,35 +12,95 @@ import logging
 from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime
+import hashlib
 import json
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Comparison metrics and their direction (-1: lower is better, +1: higher is better)
+IMPROVEMENT_KEYS = ('rmse', 'mae', 'r2', 'perkins_score')
+IMPROVEMENT_SIGNS = {'rmse': -1.0, 'mae': -1.0, 'r2': 1.0, 'perkins_score': 1.0}
+
 try:
+    import matplotlib
+    matplotlib.use('Agg')  # Non-interactive backend
     import matplotlib.pyplot as plt
     import matplotlib.patches as mpatches
-    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib import font_manager
     MATPLOTLIB_AVAILABLE = True
 except ImportError:
     MATPLOTLIB_AVAILABLE = False
     logger.warning("matplotlib not available. Install with: pip install matplotlib")
 
+if MATPLOTLIB_AVAILABLE:
+    # Minimal darkgrid look, set once at import instead of loading the
+    # full seaborn style sheet per exporter
+    plt.rcParams.update({
+        'axes.grid': True,
+        'axes.facecolor': '#eaeaf2',
+        'axes.edgecolor': 'white',
+        'axes.linewidth': 1.25,
+        'grid.color': 'white',
+        'grid.alpha': 0.3,
+        'font.size': 11,
+        # Drop near-collinear vertices from long loss curves
+        'path.simplify': True,
+        'path.simplify_threshold': 1.0,
+        # Keep text as text in SVG output
+        'svg.fonttype': 'none'
+    })
+    # Load the font cache now rather than on the first plot
+    font_manager.fontManager
+
+
+def _cache_encode(value):
+    """
+    JSON encoding of export_all inputs that json cannot serialize itself
+    
+    Arrays are hashed over their dtype, shape and full bytes (str() would
+    abbreviate long arrays with "..."). Anything else raises TypeError, so
+    the inputs are not cached rather than keyed by their str().
+    """
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        digest = hashlib.blake2b(array.view(np.uint8), digest_size=16).hexdigest()
+        return {'ndarray': [array.dtype.str, list(array.shape), digest]}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not hashable for the export cache")
+
 
 class ResultsExporter:
     """Export results and figures for final report"""
     
-    def __init__(self, output_dir: Path):
+    def __init__(self, output_dir: Path, dpi: int = 120, fmt: str = 'png'):
         """
         Initialize results exporter
         
         Args:
             output_dir: Directory to save exported files
+            dpi: Resolution of raster figures
+            fmt: Default figure format ('png' or 'svg')
         """
+        if fmt not in ('png', 'svg'):
+            raise ValueError(f"Unsupported figure format: {fmt}")
+        
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._dpi = dpi
+        self._fmt = fmt
         
+        # Single figure reused by every plot (cleared between plots) so the
+        # backend setup is paid once per exporter
+        self._fig = None
+        self._ax = None
         if MATPLOTLIB_AVAILABLE:
-            plt.style.use('seaborn-v0_8-darkgrid')
+            self._fig = Figure(figsize=(10, 6))
+            self._ax = self._fig.add_subplot()
         
         logger.info(f"Results Exporter initialized: {output_dir}")
     
@@ -72,22 +132,24 @@ class ResultsExporter:
         }
         
         if baseline_metrics:
-            # Calculate improvements
-            for key in ['rmse', 'mae', 'r2', 'perkins_score']:
-                if key in metrics and key in baseline_metrics:
-                    if key in ['rmse', 'mae']:
-                        # Lower is better
-                        improvement = baseline_metrics[key] - metrics[key]
-                        improvement_pct = (improvement / baseline_metrics[key]) * 100
-                    else:
-                        # Higher is better
-                        improvement = metrics[key] - baseline_metrics[key]
-                        improvement_pct = (improvement / baseline_metrics[key]) * 100 if baseline_metrics[key] != 0 else 0
-                    
-                    comparison['improvements'][key] = {
-                        'absolute': float(improvement),
-                        'percentage': float(improvement_pct)
-                    }
+            # Calculate improvements over the metrics present in both sets
+            keys = [k for k in IMPROVEMENT_KEYS if k in metrics and k in baseline_metrics]
+            if keys:
+                signs = np.array([IMPROVEMENT_SIGNS[k] for k in keys])
+                model = np.array([metrics[k] for k in keys], dtype=np.float64)
+                baseline = np.array([baseline_metrics[k] for k in keys], dtype=np.float64)
+                
+                improvement = signs * (model - baseline)
+                # Percentage is 0 where the baseline is 0
+                improvement_pct = np.divide(
+                    100.0 * improvement, baseline,
+                    out=np.zeros_like(improvement), where=baseline != 0
+                )
+                
+                comparison['improvements'] = {
+                    key: {'absolute': float(imp), 'percentage': float(pct)}
+                    for key, imp, pct in zip(keys, improvement, improvement_pct)
+                }
         
         with open(output_path, 'w') as f:
             json.dump(comparison, f, indent=2)
@@ -116,7 +178,7 @@ class ResultsExporter:
             raise ImportError("matplotlib is required for plotting")
         
         if output_path is None:
-            output_path = self.output_dir / 'metrics_comparison.png'
+            output_path = self.output_dir / f'metrics_comparison.{self._fmt}'
         
         # Prepare data
         metric_names = ['RMSE', 'MAE', 'R²', 'Perkins Score']
@@ -130,7 +192,8 @@ class ResultsExporter:
         x = np.arange(len(metric_names))
         width = 0.35
         
-        fig, ax = plt.subplots(figsize=(10, 6))
+        ax = self._ax
+        ax.clear()
         
         bars1 = ax.bar(x - width/2, prithvi_values, width, label='Prithvi WxC', color='#3b82f6')
         
@@ -151,9 +214,8 @@ class ResultsExporter:
         ax.legend()
         ax.grid(True, alpha=0.3, axis='y')
         
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._fig.tight_layout()
+        self._fig.savefig(output_path, dpi=self._dpi, bbox_inches='tight')
         
         logger.info(f"✅ Metrics comparison plot saved to {output_path}")
         return output_path
@@ -179,11 +241,12 @@ class ResultsExporter:
             raise ImportError("matplotlib is required for plotting")
         
         if output_path is None:
-            output_path = self.output_dir / 'training_history.png'
+            output_path = self.output_dir / f'training_history.{self._fmt}'
         
         epochs = range(1, len(train_losses) + 1)
         
-        fig, ax = plt.subplots(figsize=(10, 6))
+        ax = self._ax
+        ax.clear()
         ax.plot(epochs, train_losses, 'b-', label='Training Loss', linewidth=2)
         ax.plot(epochs, val_losses, 'r-', label='Validation Loss', linewidth=2)
         
@@ -193,9 +256,8 @@ class ResultsExporter:
         ax.legend(fontsize=11)
         ax.grid(True, alpha=0.3)
         
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._fig.tight_layout()
+        self._fig.savefig(output_path, dpi=self._dpi, bbox_inches='tight')
         
         logger.info(f"✅ Training history plot saved to {output_path}")
         return output_path
@@ -261,6 +323,33 @@ class ResultsExporter:
         Returns:
             Dictionary mapping export names to file paths
         """
+        # Identical inputs produce identical files: reuse the previous export
+        cache_path = self.output_dir / '.export_cache.json'
+        try:
+            key = hashlib.blake2b(json.dumps({
+                'metrics': metrics,
+                'physics_validation': physics_validation,
+                'baseline_metrics': baseline_metrics,
+                'train_losses': train_losses,
+                'val_losses': val_losses,
+                'dpi': self._dpi,
+                'fmt': self._fmt
+            }, sort_keys=True, default=_cache_encode).encode(), digest_size=8).hexdigest()
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Export inputs cannot be cached ({e}), exporting without cache")
+            key = None
+        
+        if key is not None and cache_path.exists():
+            try:
+                with open(cache_path) as f:
+                    cache = json.load(f)
+                cached = {name: Path(path) for name, path in cache.get('exports', {}).items()}
+                if cache.get('key') == key and cached and all(p.exists() for p in cached.values()):
+                    logger.info(f"✅ Exports up to date (cache key {key}), skipping")
+                    return cached
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable export cache: {e}")
+        
         logger.info("Exporting all results and figures...")
         
         exports = {}
@@ -289,6 +378,13 @@ class ResultsExporter:
             baseline_comparison
         )
         
+        if key is not None:
+            with open(cache_path, 'w') as f:
+                json.dump({'key': key, 'exports': {name: str(path) for name, path in exports.items()}}, f, indent=2)
+        elif cache_path.exists():
+            # The files changed: a stale key must not match them anymore
+            cache_path.unlink()
+        
         logger.info(f"✅ All exports complete: {len(exports)} files generated")
         return exports
 
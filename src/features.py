@@ -8,7 +8,7 @@ Phase 1: Mock calculations on synthetic data.
 import json
 import logging
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional, Tuple
 import numpy as np
 import rasterio
 
@@ -17,33 +17,98 @@ from src.models import Manifest, RasterMetadata, Bounds
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Index rasters are stored as int16 scaled by 10000 (Sentinel-2 L2A convention)
+INDEX_SCALE = 1e-4
+INDEX_NODATA = -32768
 
-def compute_ndvi_mock(
+# Fixed-seed PCG64 generator for the mock noise (reproducible, float32 draws)
+_RNG = np.random.default_rng(seed=20220715)
+
+
+def _invalid_mask(tile: np.ndarray, nodata: Optional[float]) -> np.ndarray:
+    """Pixels of a base raster tile without a value (non-finite or nodata)"""
+    invalid = ~np.isfinite(tile)
+    if nodata is not None and np.isfinite(nodata):
+        invalid |= tile == nodata
+    return invalid
+
+
+def _block_min_max(src: rasterio.DatasetReader) -> Tuple[float, float]:
+    """
+    Global min/max of band 1, scanned block by block
+    
+    Args:
+        src: Open source raster
+        
+    Returns:
+        (min, max) over the valid pixels of the whole band
+    """
+    dmin, dmax = np.inf, -np.inf
+    for _, window in src.block_windows(1):
+        tile = src.read(1, window=window)
+        valid = tile[~_invalid_mask(tile, src.nodata)]
+        if valid.size:
+            dmin = min(dmin, float(valid.min()))
+            dmax = max(dmax, float(valid.max()))
+    return dmin, dmax
+
+
+def _kernel_ndvi(tile: np.ndarray, dmin: float, dmax: float) -> np.ndarray:
+    """Mock NDVI on one float32 tile (overwritten): higher in cooler areas (vegetation)"""
+    # 0.3 + 0.5 * (1 - normalized_temp), computed in place in float32
+    ndvi = tile
+    ndvi -= np.float32(dmin)
+    ndvi /= np.float32(dmax - dmin)
+    ndvi *= np.float32(-0.5)
+    ndvi += np.float32(0.8)
+    ndvi += _RNG.standard_normal(tile.shape, dtype=np.float32) * np.float32(0.05)
+    return np.clip(ndvi, -1, 1, out=ndvi)  # NDVI range [-1, 1]
+
+
+def _kernel_ndbi(tile: np.ndarray, dmin: float, dmax: float) -> np.ndarray:
+    """Mock NDBI on one float32 tile (overwritten): higher in warmer areas (urban)"""
+    # -0.2 + 0.6 * normalized_temp, computed in place in float32
+    ndbi = tile
+    ndbi -= np.float32(dmin)
+    ndbi /= np.float32(dmax - dmin)
+    ndbi *= np.float32(0.6)
+    ndbi -= np.float32(0.2)
+    ndbi += _RNG.standard_normal(tile.shape, dtype=np.float32) * np.float32(0.05)
+    return np.clip(ndbi, -1, 1, out=ndbi)
+
+
+def compute_indices(
     input_path: Path,
-    output_path: Path
+    output_path: Path,
+    band_name: str,
+    kernel: Callable[[np.ndarray, float, float], np.ndarray],
+    data_range: Optional[Tuple[float, float]] = None
 ) -> RasterMetadata:
     """
-    Compute mock NDVI (Normalized Difference Vegetation Index)
+    Compute a spectral index raster tile by tile
     
-    NDVI = (NIR - Red) / (NIR + Red)
-    Phase 1: Generate synthetic NDVI pattern
+    Only one 256x256 block is held in memory at a time: the base raster
+    is scanned once for its min/max (unless data_range is given), then each output block is read into
+    a reused float32 buffer, computed in place and written from a reused
+    int16 buffer.
+    
+    Values are stored as int16 with scale_factor INDEX_SCALE, so
+    physical index = stored * 1e-4 (GDAL applies this via the band scale).
+    Base pixels that are NaN or nodata are written as INDEX_NODATA.
     
     Args:
         input_path: Base temperature raster (used for spatial reference)
-        output_path: Output NDVI raster
+        output_path: Output index raster
+        band_name: Band description / metadata name of the index
+        kernel: Function mapping (float32 tile, dmin, dmax) to index
+            values; it may overwrite the tile
+        data_range: Precomputed (min, max) of the base raster
         
     Returns:
-        Metadata of NDVI raster
+        Metadata of index raster
     """
     with rasterio.open(input_path) as src:
-        # Read base data for spatial reference
-        data = src.read(1)
-        
-        # Generate mock NDVI: higher in cooler areas (vegetation)
-        # Inverse relationship with temperature
-        normalized_temp = (data - data.min()) / (data.max() - data.min())
-        ndvi = 0.3 + 0.5 * (1 - normalized_temp) + np.random.normal(0, 0.05, data.shape)
-        ndvi = np.clip(ndvi, -1, 1)  # NDVI range [-1, 1]
+        dmin, dmax = data_range if data_range is not None else _block_min_max(src)
         
         # Write output
         output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -54,14 +119,44 @@ def compute_ndvi_mock(
             height=src.height,
             width=src.width,
             count=1,
-            dtype='float32',
+            dtype='int16',
+            nodata=INDEX_NODATA,
             crs=src.crs,
             transform=src.transform,
-            compress='lzw',
-            tiled=True
+            # Horizontal differencing suits smooth int16 fields
+            compress='deflate',
+            predictor=2,
+            num_threads='ALL_CPUS',
+            tiled=True,
+            blockxsize=256,
+            blockysize=256
         ) as dst:
-            dst.write(ndvi.astype('float32'), 1)
-            dst.set_band_description(1, "ndvi")
+            # Scratch blocks, sliced down for the partial edge blocks
+            block_height, block_width = dst.block_shapes[0]
+            tile_buffer = np.empty((block_height, block_width), dtype=np.float32)
+            index_buffer = np.empty((block_height, block_width), dtype=np.int16)
+            
+            # Iterate the output's block grid so every write lands on a
+            # whole GeoTIFF tile
+            for _, window in dst.block_windows(1):
+                shape = (window.height, window.width)
+                tile = src.read(1, window=window, out=tile_buffer[:shape[0], :shape[1]])
+                invalid = _invalid_mask(tile, src.nodata)
+                has_invalid = invalid.any()
+                scaled = kernel(tile, dmin, dmax)
+                scaled *= np.float32(1 / INDEX_SCALE)
+                if has_invalid:
+                    # Keep NaN out of the int16 cast, then flag as nodata
+                    scaled[invalid] = 0
+                index = index_buffer[:shape[0], :shape[1]]
+                np.rint(scaled, out=index, casting='unsafe')
+                if has_invalid:
+                    index[invalid] = INDEX_NODATA
+                dst.write(index, 1, window=window)
+            dst.set_band_description(1, band_name)
+            dst.scales = (INDEX_SCALE,)
+            dst.offsets = (0.0,)
+            dst.update_tags(1, scale_factor=str(INDEX_SCALE), add_offset="0.0")
         
         # Extract metadata
         with rasterio.open(output_path) as dst:
@@ -81,16 +176,43 @@ def compute_ndvi_mock(
                     maxy=bounds.top
                 ),
                 band_count=dst.count,
-                band_names=["ndvi"]
+                band_names=[band_name],
+                scale_factor=dst.scales[0],
+                add_offset=dst.offsets[0]
             )
     
+    return metadata
+
+
+def compute_ndvi_mock(
+    input_path: Path,
+    output_path: Path,
+    data_range: Optional[Tuple[float, float]] = None
+) -> RasterMetadata:
+    """
+    Compute mock NDVI (Normalized Difference Vegetation Index)
+    
+    NDVI = (NIR - Red) / (NIR + Red)
+    Phase 1: Generate synthetic NDVI pattern
+    
+    Args:
+        input_path: Base temperature raster (used for spatial reference)
+        output_path: Output NDVI raster
+        data_range: Precomputed (min, max) of the base raster
+        
+    Returns:
+        Metadata of NDVI raster
+    """
+    # Inverse relationship with temperature
+    metadata = compute_indices(input_path, output_path, "ndvi", _kernel_ndvi, data_range)
     logger.info(f"✅ Computed NDVI: {output_path.name}")
     return metadata
 
 
 def compute_ndbi_mock(
     input_path: Path,
-    output_path: Path
+    output_path: Path,
+    data_range: Optional[Tuple[float, float]] = None
 ) -> RasterMetadata:
     """
     Compute mock NDBI (Normalized Difference Built-up Index)
@@ -101,57 +223,12 @@ def compute_ndbi_mock(
     Args:
         input_path: Base temperature raster
         output_path: Output NDBI raster
+        data_range: Precomputed (min, max) of the base raster
         
     Returns:
         Metadata of NDBI raster
     """
-    with rasterio.open(input_path) as src:
-        data = src.read(1)
-        
-        # Generate mock NDBI: higher in warmer areas (urban)
-        normalized_temp = (data - data.min()) / (data.max() - data.min())
-        ndbi = -0.2 + 0.6 * normalized_temp + np.random.normal(0, 0.05, data.shape)
-        ndbi = np.clip(ndbi, -1, 1)
-        
-        # Write output
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with rasterio.open(
-            output_path,
-            'w',
-            driver='GTiff',
-            height=src.height,
-            width=src.width,
-            count=1,
-            dtype='float32',
-            crs=src.crs,
-            transform=src.transform,
-            compress='lzw',
-            tiled=True
-        ) as dst:
-            dst.write(ndbi.astype('float32'), 1)
-            dst.set_band_description(1, "ndbi")
-        
-        # Extract metadata
-        with rasterio.open(output_path) as dst:
-            bounds = dst.bounds
-            metadata = RasterMetadata(
-                crs=str(dst.crs),
-                transform=list(dst.transform)[:6],
-                width=dst.width,
-                height=dst.height,
-                nodata=dst.nodata,
-                dtype=str(dst.dtypes[0]),
-                units="index",
-                bounds=Bounds(
-                    minx=bounds.left,
-                    miny=bounds.bottom,
-                    maxx=bounds.right,
-                    maxy=bounds.top
-                ),
-                band_count=dst.count,
-                band_names=["ndbi"]
-            )
-    
+    metadata = compute_indices(input_path, output_path, "ndbi", _kernel_ndbi, data_range)
     logger.info(f"✅ Computed NDBI: {output_path.name}")
     return metadata
 
@@ -172,8 +249,8 @@ def features_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     if not manifest.paths or not manifest.paths.intermediate:
         raise ValueError("No intermediate data path in manifest")
     
-    intermediate_dir = Path(manifest.paths.intermediate.replace("gs://", "/tmp/gcs/"))
-    features_dir = Path(manifest.paths.features.replace("gs://", "/tmp/gcs/"))
+    intermediate_dir = manifest.paths.local_intermediate
+    features_dir = manifest.paths.local_features
     features_dir.mkdir(parents=True, exist_ok=True)
     
     # Use temperature raster as base for spatial reference
@@ -185,14 +262,18 @@ def features_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
         manifest.stage = "features"
         return manifest
     
+    # Both indices normalize the same base raster: scan its range once
+    with rasterio.open(base_raster) as src:
+        data_range = _block_min_max(src)
+    
     # Compute indices
     metadata_dict = {}
     
     ndvi_path = features_dir / "ndvi.tif"
-    metadata_dict["ndvi"] = compute_ndvi_mock(base_raster, ndvi_path).to_json()
+    metadata_dict["ndvi"] = compute_ndvi_mock(base_raster, ndvi_path, data_range).to_json()
     
     ndbi_path = features_dir / "ndbi.tif"
-    metadata_dict["ndbi"] = compute_ndbi_mock(base_raster, ndbi_path).to_json()
+    metadata_dict["ndbi"] = compute_ndbi_mock(base_raster, ndbi_path, data_range).to_json()
     
     # Update manifest with feature variables
     manifest.variables.extend(["ndvi", "ndbi"])
@@ -206,7 +287,7 @@ def features_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     # Save updated manifest
     manifest_path = features_dir / "manifest.json"
     with open(manifest_path, 'w') as f:
-        json.dump(manifest.to_json(), f, indent=2)
+        f.write(manifest.model_dump_json(indent=2))
     
     logger.info(f"✅ Features complete: {len(metadata_dict)} indices")
     logger.info(f"   Output: {features_dir}")
@@ -8,6 +8,8 @@ GPU memory while preserving model performance.
 Reference: QLoRA: Efficient Finetuning of Quantized LLMs (Dettmers et al., 2023)
 """
 
+import functools
+import importlib.util
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -17,7 +19,7 @@ logger = logging.getLogger(__name__)
 
 try:
     import torch
-    from transformers import TrainingArguments, Trainer
+    from transformers import TrainingArguments, Trainer, TrainerCallback
     from peft import LoraConfig, get_peft_model, TaskType
     from peft import prepare_model_for_kbit_training
     from transformers import BitsAndBytesConfig
@@ -27,6 +29,68 @@ except ImportError:
     logger.warning("transformers/peft not available. Install with: pip install transformers peft bitsandbytes accelerate")
 
 
+if TRANSFORMERS_AVAILABLE:
+    @torch.jit.script
+    def _composite_loss_kernel(
+        predictions: torch.Tensor,
+        targets: torch.Tensor,
+        pixel_weight: float,
+        perceptual_weight: float,
+        pinn_weight: float
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        TorchScript composite loss: returns (total_loss, pixel_loss)
+        
+        Perceptual and PINN terms are simplified placeholders scaled from
+        the pixel loss, so a zero weight simply drops the term without
+        allocating a zero tensor.
+        """
+        # Pixel-wise MSE loss
+        pixel_loss = torch.nn.functional.mse_loss(predictions, targets)
+        
+        # Perceptual loss (VGG features) - simplified
+        # In production, would use VGG features
+        perceptual_loss = pixel_loss * 0.1
+        
+        # Physics-informed loss (PINN) - simplified
+        # In production, would enforce physical constraints
+        pinn_loss = pixel_loss * 0.01
+        
+        total_loss = (
+            pixel_weight * pixel_loss +
+            perceptual_weight * perceptual_loss +
+            pinn_weight * pinn_loss
+        )
+        return total_loss, pixel_loss
+    
+    def _composite_loss_impl(
+        predictions,
+        targets,
+        inputs=None,
+        *,
+        track: bool = True,
+        loss_accum: List,
+        pixel_weight: float,
+        perceptual_weight: float,
+        pinn_weight: float
+    ):
+        """
+        Composite loss bound by create_composite_loss via functools.partial
+        
+        The breakdown is only accumulated when track is set (training
+        steps), so evaluation losses never show up in loss_breakdown().
+        """
+        # Physics constraints need the model inputs
+        phys_weight = pinn_weight if inputs is not None else 0.0
+        total_loss, pixel_loss = _composite_loss_kernel(
+            predictions, targets, pixel_weight, perceptual_weight, phys_weight
+        )
+        # No .item() here: a GPU->CPU sync per step would stall training
+        if track:
+            loss_accum.append((total_loss.detach(), pixel_loss.detach()))
+        return total_loss
+
+
 class PrithviFineTuner:
     """Fine-tune Prithvi WxC using QLoRA"""
     
@@ -74,6 +138,10 @@ class PrithviFineTuner:
         self.model = None
         self.processor = None
         
+        # Detached (total, pixel) losses since the last logged breakdown
+        self._loss_accum: List[Tuple] = []
+        self._loss_weights = (1.0, 0.1, 0.01)
+        
         logger.info(f"Prithvi Fine-Tuner initialized (LoRA r={lora_r}, alpha={lora_alpha})")
     
     def setup_model(
@@ -92,24 +160,33 @@ class PrithviFineTuner:
         
         logger.info(f"Loading model: {model_name}")
         
+        # Weights, 4-bit compute and AMP (see _precision_flags) share one dtype
+        compute_dtype = self._compute_dtype()
+        
         # Configure quantization if using 4-bit
         if self.use_4bit:
             quantization_config = BitsAndBytesConfig(
                 load_in_4bit=True,
-                bnb_4bit_compute_dtype=torch.float16,
+                bnb_4bit_compute_dtype=compute_dtype,
                 bnb_4bit_use_double_quant=True,
                 bnb_4bit_quant_type="nf4"
             )
         else:
             quantization_config = None
         
+        # Fused attention kernel: FlashAttention-2 if installed, else PyTorch SDPA
+        attn_implementation = (
+            "flash_attention_2" if importlib.util.find_spec("flash_attn") else "sdpa"
+        )
+        
         # Load model with quantization
         self.model = AutoModel.from_pretrained(
             model_name,
             cache_dir=str(cache_dir) if cache_dir else None,
             quantization_config=quantization_config,
             device_map="auto",
-            torch_dtype=torch.float16
+            torch_dtype=compute_dtype,
+            attn_implementation=attn_implementation
         )
         
         # Prepare for k-bit training
@@ -144,47 +221,85 @@ class PrithviFineTuner:
             pinn_weight: Weight for physics-informed loss
             
         Returns:
-            Loss function
+            Loss function returning the total loss tensor. The breakdown is
+            kept on-device and read with loss_breakdown().
         """
-        def composite_loss(predictions, targets, inputs=None):
-            # Pixel-wise MSE loss
-            pixel_loss = torch.nn.functional.mse_loss(predictions, targets)
-            
-            # Perceptual loss (VGG features) - simplified
-            # In production, would use VGG features
-            perceptual_loss = torch.tensor(0.0, device=predictions.device)
-            if perceptual_weight > 0:
-                # Placeholder - would compute VGG features
-                perceptual_loss = pixel_loss * 0.1  # Simplified
-            
-            # Physics-informed loss (PINN) - simplified
-            # In production, would enforce physical constraints
-            pinn_loss = torch.tensor(0.0, device=predictions.device)
-            if pinn_weight > 0 and inputs is not None:
-                # Placeholder - would compute physics constraints
-                pinn_loss = pixel_loss * 0.01  # Simplified
-            
-            total_loss = (
-                pixel_weight * pixel_loss +
-                perceptual_weight * perceptual_loss +
-                pinn_weight * pinn_loss
-            )
-            
-            return total_loss, {
-                'pixel_loss': pixel_loss.item(),
-                'perceptual_loss': perceptual_loss.item(),
-                'pinn_loss': pinn_loss.item(),
-                'total_loss': total_loss.item()
-            }
-        
-        return composite_loss
+        self._loss_weights = (float(pixel_weight), float(perceptual_weight), float(pinn_weight))
+        
+        return functools.partial(
+            _composite_loss_impl,
+            loss_accum=self._loss_accum,
+            pixel_weight=self._loss_weights[0],
+            perceptual_weight=self._loss_weights[1],
+            pinn_weight=self._loss_weights[2]
+        )
+    
+    def loss_breakdown(self) -> Dict[str, float]:
+        """
+        Mean loss components since the last call
+        
+        Reads the accumulated losses back to the CPU in a single sync and
+        resets the accumulator.
+        
+        Returns:
+            Dictionary with pixel, perceptual, PINN and total loss
+        """
+        if not self._loss_accum:
+            return {}
+        
+        total, pixel = torch.stack(
+            [torch.stack(pair) for pair in self._loss_accum]
+        ).float().mean(dim=0).tolist()
+        self._loss_accum.clear()
+        
+        _, perceptual_weight, pinn_weight = self._loss_weights
+        return {
+            'pixel_loss': pixel,
+            'perceptual_loss': pixel * 0.1 if perceptual_weight > 0 else 0.0,
+            'pinn_loss': pixel * 0.01 if pinn_weight > 0 else 0.0,
+            'total_loss': total
+        }
+    
+    @staticmethod
+    def _compute_dtype() -> "torch.dtype":
+        """
+        Model and mixed-precision dtype for the current device
+        
+        bf16 (no loss scaling) where the GPU supports it, fp16 on older CUDA
+        GPUs (T4/V100), full precision on CPU.
+        
+        Returns:
+            torch.bfloat16, torch.float16 or torch.float32
+        """
+        if not torch.cuda.is_available():
+            return torch.float32
+        return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    
+    @classmethod
+    def _precision_flags(cls) -> Dict[str, bool]:
+        """
+        Mixed-precision TrainingArguments flags for the current device
+        
+        AMP runs in _compute_dtype(), the dtype setup_model loads the
+        weights in; TF32 matmuls only on Ampere or newer, where
+        TrainingArguments accepts them.
+        
+        Returns:
+            Dictionary with bf16, fp16 and tf32 flags
+        """
+        dtype = cls._compute_dtype()
+        return {
+            'bf16': dtype == torch.bfloat16,
+            'fp16': dtype == torch.float16,
+            'tf32': torch.cuda.is_available() and torch.cuda.get_device_capability()[0] >= 8
+        }
     
     def train(
         self,
         train_dataset,
         val_dataset,
         num_epochs: int = 10,
-        batch_size: int = 4,
+        batch_size: int = 8,
         learning_rate: float = 2e-4,
         warmup_steps: int = 100,
         save_steps: int = 500,
@@ -224,31 +339,51 @@ class PrithviFineTuner:
             evaluation_strategy="steps",
             eval_steps=save_steps,
             save_total_limit=3,
-            load_best_model_at_end=True,
-            metric_for_best_model="loss",
-            greater_is_better=False,
-            fp16=True,
+            # QLoRA pairing: 8-bit optimizer state, paged to CPU on spikes
+            # (bitsandbytes is only guaranteed when 4-bit loading is enabled)
+            optim="paged_adamw_8bit" if self.use_4bit else "adamw_torch",
+            **self._precision_flags(),
+            gradient_checkpointing=True,
             gradient_accumulation_steps=4,
-            report_to="none"  # Disable wandb/tensorboard for now
+            report_to=[]  # Disable wandb/tensorboard for now
         )
         
-        # Create composite loss
-        loss_fn = self.create_composite_loss()
+        # Create composite loss (pre-bound weights)
+        self._loss = self.create_composite_loss()
         
         # Custom trainer with composite loss
         class CustomTrainer(Trainer):
+            _fn = None
+            
             def compute_loss(self, model, inputs, return_outputs=False):
                 # This is simplified - actual implementation needs proper data handling
                 outputs = model(**inputs)
-                loss, loss_dict = loss_fn(outputs.logits, inputs['labels'], inputs)
+                # prediction_step calls this too: only training steps feed
+                # the logged loss breakdown
+                loss = self._fn(outputs.logits, inputs['labels'], inputs, track=model.training)
                 return (loss, outputs) if return_outputs else loss
         
+        # Log the loss breakdown only on logging steps
+        fine_tuner = self
+        
+        class LossBreakdownCallback(TrainerCallback):
+            def on_step_end(self, args, state, control, **kwargs):
+                if state.global_step % args.logging_steps == 0:
+                    breakdown = fine_tuner.loss_breakdown()
+                    if breakdown:
+                        logger.info(
+                            f"Step {state.global_step}: " +
+                            ", ".join(f"{k}={v:.4f}" for k, v in breakdown.items())
+                        )
+        
         trainer = CustomTrainer(
             model=self.model,
             args=training_args,
             train_dataset=train_dataset,
             eval_dataset=val_dataset,
+            callbacks=[LossBreakdownCallback()],
         )
+        trainer._fn = self._loss
         
         # Train
         train_result = trainer.train()
@@ -7,18 +7,242 @@ Extracts administrative boundaries from GADM and calculates spatial indicators
 Optimized for performance using GeoPandas and spatial indexing.
 """
 
+import hashlib
+import math
+from functools import lru_cache
 import geopandas as gpd
+import pyogrio
+import shapely
 import pandas as pd
 import numpy as np
 import xarray as xr
 import rasterio
-from rasterio.mask import mask
+from affine import Affine
+from rasterio.errors import WindowError
+from rasterio.features import rasterize
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
+from scipy import ndimage
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Number of zone label grids kept per calculator
+LABEL_CACHE_SIZE = 8
+
+
+def _zone_bincount(
+    labels: np.ndarray,
+    index: np.ndarray,
+    weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Per-label pixel count, or weight sum, for the labels in index"""
+    size = int(np.max(index)) + 1 if len(index) else 1
+    if weights is not None:
+        weights = weights.ravel().astype(np.float64, copy=False)
+    return np.bincount(labels.ravel(), weights=weights, minlength=size)[index]
+
+
+def _zone_sum(values: np.ndarray, labels: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """Per-zone sum in one np.bincount pass"""
+    return _zone_bincount(labels, index, weights=values)
+
+
+def _zone_mean(values: np.ndarray, labels: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """Per-zone mean (NaN for empty zones)"""
+    return _zone_sum(values, labels, index) / _zone_bincount(labels, index)
+
+
+def _zone_std(
+    values: np.ndarray,
+    labels: np.ndarray,
+    index: np.ndarray,
+    zone_mean: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Per-zone population standard deviation, centred on the zone mean"""
+    if zone_mean is None:
+        zone_mean = _zone_mean(values, labels, index)
+    label_mean = np.zeros(int(np.max(index)) + 1 if len(index) else 1)
+    label_mean[index] = zone_mean
+    deviations = values - label_mean[labels]
+    return np.sqrt(_zone_mean(deviations * deviations, labels, index))
+
+
+# Per-zone reductions over a label grid (label 0 = background), all with
+# the scipy.ndimage (input, labels, index) signature
+ZONAL_REDUCERS = {
+    'mean': _zone_mean,
+    'min': ndimage.minimum,
+    'max': ndimage.maximum,
+    'std': _zone_std,
+    'sum': _zone_sum
+}
+
+# Statistics reported by calculate_temperature_indicators by default
+TEMPERATURE_STATISTICS = ('mean', 'min', 'max', 'std')
+
+
+def _zone_identifiers(zones: gpd.GeoDataFrame) -> Tuple[List, List]:
+    """
+    Zone IDs and names, preferring the finest GADM level available
+    
+    Args:
+        zones: GeoDataFrame with administrative zones
+        
+    Returns:
+        (zone_ids, zone_names) lists aligned with the rows of zones
+    """
+    def first_column(columns: List[str], default: List) -> List:
+        for column in columns:
+            if column in zones.columns:
+                return zones[column].tolist()
+        return default
+    
+    zone_ids = first_column(['GID_2', 'GID_1', 'GID_0'], list(zones.index))
+    zone_names = first_column(['NAME_2', 'NAME_1', 'NAME_0'], ['Unknown'] * len(zones))
+    return zone_ids, zone_names
+
+
+def _geometry_fingerprint(geometries: gpd.GeoSeries) -> bytes:
+    """Digest of the zone geometries (WKB, in order), for cache keys"""
+    digest = hashlib.blake2b(digest_size=16)
+    for wkb in shapely.to_wkb(geometries.values):
+        digest.update(wkb)
+    return digest.digest()
+
+
+def _bounds_window(
+    src: rasterio.DatasetReader,
+    bounds: Tuple[float, float, float, float]
+) -> Optional[Window]:
+    """
+    Whole-pixel raster window covering bounds, clipped to the raster
+    
+    Args:
+        src: Open raster
+        bounds: (minx, miny, maxx, maxy) in the raster CRS
+        
+    Returns:
+        Window, or None if bounds do not overlap the raster (or are NaN,
+        as the total bounds of no zones are)
+    """
+    if not np.all(np.isfinite(bounds)):
+        return None
+    window = from_bounds(*bounds, transform=src.transform)
+    col_off, row_off = math.floor(window.col_off), math.floor(window.row_off)
+    window = Window(
+        col_off,
+        row_off,
+        math.ceil(window.col_off + window.width) - col_off,
+        math.ceil(window.row_off + window.height) - row_off
+    )
+    try:
+        return window.intersection(Window(0, 0, src.width, src.height))
+    except WindowError:
+        return None
+
+
+def _grid_transform(lons: np.ndarray, lats: np.ndarray) -> Affine:
+    """
+    Affine transform of a regular grid given its 1-D cell-centre coordinates
+    
+    Args:
+        lons: Longitudes of the grid columns
+        lats: Latitudes of the grid rows (ascending or descending)
+        
+    Returns:
+        Transform mapping (col, row) to the cell's outer corner
+    """
+    dx = float(lons[1] - lons[0])
+    dy = float(lats[1] - lats[0])
+    return Affine(dx, 0.0, float(lons[0]) - dx / 2, 0.0, dy, float(lats[0]) - dy / 2)
+
+
+def _is_regular(coords: np.ndarray) -> bool:
+    """True if 1-D coordinates are evenly spaced (at least two of them)"""
+    if len(coords) < 2:
+        return False
+    steps = np.diff(coords)
+    return bool(np.allclose(steps, steps[0]))
+
+
+def _label_points(
+    geometries: gpd.GeoSeries,
+    lons: np.ndarray,
+    lats: np.ndarray
+) -> np.ndarray:
+    """
+    Zone label grid by point-in-polygon tests on grid cell centres
+    
+    Works on any rectilinear grid. Each zone only tests the cells inside
+    its bounding box, with a prepared geometry.
+    
+    Args:
+        geometries: Zone geometries (same CRS as the coordinates)
+        lons: Longitudes of the grid columns
+        lats: Latitudes of the grid rows
+        
+    Returns:
+        int32 array of shape (len(lats), len(lons)); zone i is label i + 1
+    """
+    labels = np.zeros((len(lats), len(lons)), dtype='int32')
+    for label, geom in enumerate(geometries, start=1):
+        if geom is None or geom.is_empty:
+            continue
+        minx, miny, maxx, maxy = geom.bounds
+        rows = np.flatnonzero((lats >= miny) & (lats <= maxy))
+        cols = np.flatnonzero((lons >= minx) & (lons <= maxx))
+        if len(rows) == 0 or len(cols) == 0:
+            continue
+        shapely.prepare(geom)
+        lon_grid, lat_grid = np.meshgrid(lons[cols], lats[rows])
+        slab = labels[np.ix_(rows, cols)]
+        slab[shapely.contains_xy(geom, lon_grid, lat_grid)] = label
+        labels[np.ix_(rows, cols)] = slab
+    return labels
+
+
+@lru_cache(maxsize=8)
+def _read_gadm(
+    gpkg: str,
+    mtime: float,
+    country_code: str,
+    admin_level: int,
+    columns: Optional[Tuple[str, ...]] = None
+) -> gpd.GeoDataFrame:
+    """
+    Read GADM zones of one country, memoized per file version
+    
+    The country filter is pushed down to OGR, so features of other
+    countries are never deserialized. The returned frame is shared between
+    callers and must not be mutated (load_gadm hands out copies).
+    
+    Args:
+        gpkg: Path to GADM GeoPackage
+        mtime: File modification time (part of the cache key)
+        country_code: ISO country code
+        admin_level: Administrative level (part of the cache key)
+        columns: Attribute columns to read (default: all)
+        
+    Returns:
+        GeoDataFrame with NAME_* columns as categoricals
+    """
+    fields = list(pyogrio.read_info(gpkg)['fields'])
+    if columns is not None:
+        columns = [f for f in columns if f in fields]
+    where = None
+    if 'GID_0' in fields:
+        where = "GID_0 = '{}'".format(country_code.replace("'", "''"))
+    
+    gdf = gpd.read_file(gpkg, engine='pyogrio', columns=columns, where=where)
+    
+    # Zone names repeat heavily at coarse levels
+    name_cols = [c for c in gdf.columns if c.startswith('NAME_')]
+    gdf[name_cols] = gdf[name_cols].astype('category')
+    return gdf
+
 
 class GADMIndicatorCalculator:
     """Calculate spatial indicators for GADM administrative zones"""
@@ -41,16 +265,28 @@ class GADMIndicatorCalculator:
         self.country_code = country_code
         self.admin_level = admin_level
         self.gadm_gdf = None
+        self._label_cache: Dict[tuple, np.ndarray] = {}
         
-    def load_gadm(self) -> gpd.GeoDataFrame:
-        """Load GADM boundaries"""
-        logger.info(f"Loading GADM boundaries for {self.country_code}, level {self.admin_level}")
+    def load_gadm(self, columns: Optional[List[str]] = None) -> gpd.GeoDataFrame:
+        """
+        Load GADM boundaries
         
-        self.gadm_gdf = gpd.read_file(self.gadm_gpkg)
+        Args:
+            columns: Attribute columns to read, e.g. the GID_*/NAME_* columns
+                zone lookups need (default: all columns)
+            
+        Returns:
+            GeoDataFrame of the country's zones (a copy, safe to modify)
+        """
+        logger.info(f"Loading GADM boundaries for {self.country_code}, level {self.admin_level}")
         
-        # Filter by country
-        if 'GID_0' in self.gadm_gdf.columns:
-            self.gadm_gdf = self.gadm_gdf[self.gadm_gdf['GID_0'] == self.country_code]
+        self.gadm_gdf = _read_gadm(
+            str(self.gadm_gpkg),
+            self.gadm_gpkg.stat().st_mtime,
+            self.country_code,
+            self.admin_level,
+            tuple(columns) if columns is not None else None
+        ).copy()
         
         logger.info(f"Loaded {len(self.gadm_gdf)} administrative units")
         return self.gadm_gdf
@@ -79,16 +315,54 @@ class GADMIndicatorCalculator:
         else:
             # Search in all NAME columns
             name_cols = [col for col in self.gadm_gdf.columns if col.startswith('NAME_')]
-            mask = pd.Series([False] * len(self.gadm_gdf))
-            for col in name_cols:
-                mask |= (self.gadm_gdf[col] == zone_name)
-            filtered = self.gadm_gdf[mask]
+            filtered = self.gadm_gdf[self.gadm_gdf[name_cols].eq(zone_name).any(axis=1)]
         
         if len(filtered) == 0:
             raise ValueError(f"Zone '{zone_name}' not found in GADM")
         
         return filtered
     
+    def _get_or_rasterize_zones(
+        self,
+        zones: gpd.GeoDataFrame,
+        transform: Affine,
+        shape: Tuple[int, int],
+        crs
+    ) -> np.ndarray:
+        """
+        Zone label grid for a raster grid, rasterized once per grid
+        
+        Rasters sharing a grid (e.g. an NDVI time series) reuse the same
+        labels. The cache is keyed on the zone geometries themselves, not
+        their IDs, so different or edited zones never share labels. Callers
+        get a copy they are free to modify.
+        
+        Args:
+            zones: Zones already in the raster CRS
+            transform: Affine transform of the grid
+            shape: (height, width) of the grid
+            crs: CRS of the grid
+            
+        Returns:
+            int32 label array (0 = outside all zones, zone i = i + 1)
+        """
+        key = (_geometry_fingerprint(zones.geometry), transform, tuple(shape), str(crs))
+        
+        labels = self._label_cache.get(key)
+        if labels is None:
+            labels = rasterize(
+                ((geom, i + 1) for i, geom in enumerate(zones.geometry)),
+                out_shape=shape,
+                transform=transform,
+                fill=0,
+                dtype='int32'
+            )
+            if len(self._label_cache) >= LABEL_CACHE_SIZE:
+                self._label_cache.pop(next(iter(self._label_cache)))
+            self._label_cache[key] = labels
+        
+        return labels.copy()
+    
     def calculate_zonal_statistics(
         self,
         raster_path: Path,
@@ -110,80 +384,86 @@ class GADMIndicatorCalculator:
         """
         logger.info(f"Calculating {statistic} for {len(zones)} zones from {raster_path.name}")
         
-        results = []
+        if statistic not in ZONAL_REDUCERS:
+            raise ValueError(f"Unknown statistic: {statistic}")
         
         with rasterio.open(raster_path) as src:
             # Ensure zones are in same CRS as raster
             zones_reprojected = zones.to_crs(src.crs)
             
-            for idx, zone in zones_reprojected.iterrows():
-                try:
-                    # Clip raster to zone
-                    geometry = [zone.geometry]
-                    clipped, transform = mask(src, geometry, crop=True, nodata=nodata_value)
-                    
-                    # Remove nodata values
-                    if nodata_value is not None:
-                        clipped = clipped[clipped != nodata_value]
-                    else:
-                        clipped = clipped[~np.isnan(clipped)]
-                    
-                    if len(clipped) == 0:
-                        value = np.nan
-                    else:
-                        # Calculate statistic
-                        if statistic == 'mean':
-                            value = np.nanmean(clipped)
-                        elif statistic == 'min':
-                            value = np.nanmin(clipped)
-                        elif statistic == 'max':
-                            value = np.nanmax(clipped)
-                        elif statistic == 'std':
-                            value = np.nanstd(clipped)
-                        elif statistic == 'sum':
-                            value = np.nansum(clipped)
-                        else:
-                            raise ValueError(f"Unknown statistic: {statistic}")
-                    
-                    # Get zone identifier
-                    zone_id = zone.get('GID_2', zone.get('GID_1', zone.get('GID_0', idx)))
-                    zone_name = zone.get('NAME_2', zone.get('NAME_1', zone.get('NAME_0', 'Unknown')))
-                    
-                    results.append({
-                        'zone_id': zone_id,
-                        'zone_name': zone_name,
-                        'statistic': statistic,
-                        'value': value,
-                        'pixel_count': len(clipped)
-                    })
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to process zone {idx}: {e}")
-                    continue
+            # Only read the part of the raster covered by the zones
+            window = _bounds_window(src, zones_reprojected.total_bounds)
+            if window is None:
+                logger.warning(f"Zones do not overlap {raster_path.name}")
+                return pd.DataFrame(columns=['zone_id', 'zone_name', 'statistic', 'value', 'pixel_count'])
+            
+            # Burn every zone into one label grid (0 = outside all zones)
+            labels = self._get_or_rasterize_zones(
+                zones_reprojected,
+                src.window_transform(window),
+                (window.height, window.width),
+                src.crs
+            )
+            data = src.read(1, window=window)
+        
+        # Zones without any pixel do not overlap the raster
+        n_zones = len(zones_reprojected)
+        covered = np.bincount(labels.ravel(), minlength=n_zones + 1)[1:] > 0
+        
+        # Remove nodata values by sending them to the background label
+        if nodata_value is not None:
+            labels[data == nodata_value] = 0
+        else:
+            labels[np.isnan(data)] = 0
+        
+        # All per-zone statistics in one C-level pass over the labels
+        index = np.arange(1, n_zones + 1)
+        counts = np.bincount(labels.ravel(), minlength=n_zones + 1)[1:]
+        with np.errstate(invalid='ignore', divide='ignore'):  # empty zones
+            values = np.asarray(ZONAL_REDUCERS[statistic](data, labels=labels, index=index), dtype=np.float64)
+        values[counts == 0] = np.nan
+        
+        zone_ids, zone_names = _zone_identifiers(zones_reprojected)
+        results = pd.DataFrame({
+            'zone_id': zone_ids,
+            'zone_name': zone_names,
+            'statistic': statistic,
+            'value': values,
+            'pixel_count': counts
+        })
         
-        return pd.DataFrame(results)
+        return results[covered].reset_index(drop=True)
     
     def calculate_temperature_indicators(
         self,
         era5_ds: xr.Dataset,
         zones: gpd.GeoDataFrame,
         variable: str = 't2m',
-        time_slice: Optional[int] = None
+        time_slice: Optional[int] = None,
+        statistics: Optional[List[str]] = None
     ) -> pd.DataFrame:
         """
         Calculate temperature indicators for zones from ERA5 data
         
         Args:
-            era5_ds: ERA5 xarray Dataset
+            era5_ds: ERA5 xarray Dataset; dimensions other than valid_time,
+                latitude and longitude (e.g. 'time') are pooled per zone
             zones: GeoDataFrame with administrative zones
             variable: Variable name (e.g., 't2m')
             time_slice: Optional time index to use (if None, uses first time)
+            statistics: Statistics to compute, any of 'mean', 'min', 'max',
+                'std', 'sum' (if None, uses mean, min, max and std)
             
         Returns:
-            DataFrame with zone temperature statistics
+            DataFrame with zone temperature statistics ('<stat>_temp' columns)
         """
         logger.info(f"Calculating temperature indicators for {len(zones)} zones")
         
+        statistics = list(statistics or TEMPERATURE_STATISTICS)
+        unknown = [name for name in statistics if name not in ZONAL_REDUCERS]
+        if unknown:
+            raise ValueError(f"Unknown statistic: {', '.join(unknown)}")
+        
         # Select time slice
         if 'valid_time' in era5_ds.dims:
             if time_slice is None:
@@ -192,60 +472,57 @@ class GADMIndicatorCalculator:
         else:
             data = era5_ds[variable]
         
-        results = []
-        
-        # Get coordinates
-        lons = data.longitude.values
-        lats = data.latitude.values
-        
         # Ensure zones are in WGS84
         zones_wgs84 = zones.to_crs("EPSG:4326")
         
-        for idx, zone in zones_wgs84.iterrows():
-            try:
-                # Get bounding box of zone
-                bbox = zone.geometry.bounds  # (minx, miny, maxx, maxy)
-                
-                # Find pixels within bounding box
-                lon_mask = (lons >= bbox[0]) & (lons <= bbox[2])
-                lat_mask = (lats >= bbox[1]) & (lats <= bbox[3])
-                
-                if not (lon_mask.any() and lat_mask.any()):
-                    continue
-                
-                # Extract data for bounding box
-                zone_data = data.sel(
-                    longitude=lons[lon_mask],
-                    latitude=lats[lat_mask]
-                ).values
-                
-                # Filter by actual geometry (more precise than bbox)
-                # For now, use bbox approximation (can be improved with point-in-polygon)
-                zone_data = zone_data.flatten()
-                zone_data = zone_data[~np.isnan(zone_data)]
-                
-                if len(zone_data) == 0:
-                    continue
-                
-                # Calculate statistics
-                zone_id = zone.get('GID_2', zone.get('GID_1', zone.get('GID_0', idx)))
-                zone_name = zone.get('NAME_2', zone.get('NAME_1', zone.get('NAME_0', 'Unknown')))
-                
-                results.append({
-                    'zone_id': zone_id,
-                    'zone_name': zone_name,
-                    'mean_temp': np.nanmean(zone_data),
-                    'min_temp': np.nanmin(zone_data),
-                    'max_temp': np.nanmax(zone_data),
-                    'std_temp': np.nanstd(zone_data),
-                    'pixel_count': len(zone_data)
-                })
-                
-            except Exception as e:
-                logger.warning(f"Failed to process zone {idx}: {e}")
-                continue
-        
-        return pd.DataFrame(results)
+        # Any remaining non-spatial dimensions (time, ensemble member, ...)
+        # are stacked into layers, each pooled into the zone statistics
+        lons, lats = data.longitude.values, data.latitude.values
+        values = data.transpose(..., 'latitude', 'longitude').values
+        values = values.reshape(-1, len(lats), len(lons))
+        
+        # Burn zones onto the ERA5 grid (pixel centres inside the polygon);
+        # grids that are not evenly spaced fall back to point-in-polygon tests
+        if _is_regular(lons) and _is_regular(lats):
+            grid_labels = rasterize(
+                ((geom, i + 1) for i, geom in enumerate(zones_wgs84.geometry)),
+                out_shape=values.shape[1:],
+                transform=_grid_transform(lons, lats),
+                fill=0,
+                dtype='int32'
+            )
+        else:
+            grid_labels = _label_points(zones_wgs84.geometry, lons, lats)
+        labels = np.broadcast_to(grid_labels, values.shape).copy()
+        labels[np.isnan(values)] = 0
+        
+        # Only the requested statistics, one pass each; std reuses the mean
+        n_zones = len(zones_wgs84)
+        index = np.arange(1, n_zones + 1)
+        counts = np.bincount(labels.ravel(), minlength=n_zones + 1)[1:]
+        stats = {}
+        with np.errstate(invalid='ignore', divide='ignore'):  # empty zones
+            zone_mean = None
+            if 'mean' in statistics or 'std' in statistics:
+                zone_mean = _zone_sum(values, labels, index) / counts
+            for name in statistics:
+                if name == 'mean':
+                    stats['mean_temp'] = zone_mean
+                elif name == 'std':
+                    stats['std_temp'] = _zone_std(values, labels, index, zone_mean=zone_mean)
+                else:
+                    stats[f'{name}_temp'] = ZONAL_REDUCERS[name](values, labels=labels, index=index)
+        
+        zone_ids, zone_names = _zone_identifiers(zones_wgs84)
+        results = pd.DataFrame({
+            'zone_id': zone_ids,
+            'zone_name': zone_names,
+            **stats,
+            'pixel_count': counts
+        })
+        
+        # Zones without valid pixels are skipped
+        return results[counts > 0].reset_index(drop=True)
     
     def calculate_ndvi_indicators(
         self,
@@ -300,10 +577,17 @@ class GADMIndicatorCalculator:
             temp_results = self.calculate_temperature_indicators(era5_ds, zones)
             all_results.append(temp_results)
         
-        # Calculate NDVI indicators
+        # Calculate NDVI indicators, only for zones intersecting each raster
         if ndvi_paths:
+            tree = shapely.STRtree(zones.geometry.values)
             for ndvi_path in ndvi_paths:
-                ndvi_results = self.calculate_ndvi_indicators(ndvi_path, zones)
+                with rasterio.open(ndvi_path) as src:
+                    raster_bounds = transform_bounds(src.crs, zones.crs, *src.bounds)
+                candidates = np.sort(tree.query(shapely.box(*raster_bounds), predicate='intersects'))
+                if candidates.size == 0:
+                    logger.warning(f"No zone overlaps {ndvi_path.name}, skipping it")
+                    continue
+                ndvi_results = self.calculate_ndvi_indicators(ndvi_path, zones.iloc[candidates])
                 ndvi_results['source_file'] = ndvi_path.name
                 all_results.append(ndvi_results)
         
@@ -1,55 +1,328 @@
 """
 Gap Filling Algorithm for Sentinel-2 NDVI Data
 
-Implements Random Forest-based gap filling to reconstruct missing NDVI pixels
+Implements tree ensemble gap filling to reconstruct missing NDVI pixels
 caused by cloud cover. Based on research from 2024-2025 showing Random Forest
-superiority over harmonic methods (HANTS) for complex gaps.
+superiority over harmonic methods (HANTS) for complex gaps; a histogram
+gradient boosting regressor is used as a faster drop-in for the forest.
 
 Reference: Reconstruction of a Monthly 1 km NDVI Time Series Product in China 
 Using Random Forest Methodology (MDPI, 2025)
 """
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import distance_transform_cdt
+from scipy.spatial import cKDTree
 import rasterio
 from rasterio.transform import from_bounds
+from rasterio.windows import Window
 from pathlib import Path
 from typing import Tuple, Optional, Dict
+from functools import lru_cache
 import logging
-from sklearn.ensemble import RandomForestRegressor
+import os
+import tempfile
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, mean_squared_error
 import joblib
+from joblib import Parallel, delayed
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Rows per model.predict call when filling gaps
+PREDICT_CHUNK_SIZE = 1_000_000
+
+# Stored NDVI is uint8: 0-254 maps linearly to [-1, 1], 255 is nodata
+NDVI_NODATA = 255
+
+# Gap distances are stored as uint16 when streaming files; larger ones are clipped
+MAX_GAP_DISTANCE = np.iinfo(np.uint16).max
+
+
+def _decode_ndvi(codes: np.ndarray) -> np.ndarray:
+    """Convert uint8 NDVI codes to float32 NDVI (NaN for nodata)"""
+    ndvi = codes.astype(np.float32) / 254 * 2 - 1
+    ndvi[codes == NDVI_NODATA] = np.nan
+    return ndvi
+
+
+def _encode_ndvi(ndvi: np.ndarray) -> np.ndarray:
+    """Convert float NDVI to uint8 NDVI codes (0-254)"""
+    return np.clip(np.rint((ndvi + 1) * 127), 0, 254).astype(np.uint8)
+
+
+def _missing_mask(ndvi_array: np.ndarray) -> np.ndarray:
+    """Missing pixels of a float NDVI array (NaN) or uint8 NDVI codes (255)"""
+    if ndvi_array.dtype == np.uint8:
+        return ndvi_array == NDVI_NODATA
+    return np.isnan(ndvi_array)
+
+
+@lru_cache(maxsize=None)
+def _neighbor_index(window_size: int) -> np.ndarray:
+    """
+    Flat indices of a window's cells, center excluded
+    
+    Args:
+        window_size: Size of neighborhood window (odd)
+        
+    Returns:
+        Index array of length window_size**2 - 1
+    """
+    center = (window_size // 2) * window_size + window_size // 2
+    return np.delete(np.arange(window_size * window_size), center)
+
+
+def _pad_missing(ndvi_array: np.ndarray, pad: int) -> np.ndarray:
+    """Pad float NDVI with NaN, or uint8 NDVI codes with the nodata code"""
+    if ndvi_array.dtype == np.uint8:
+        return np.pad(ndvi_array, pad, mode='constant', constant_values=NDVI_NODATA)
+    return np.pad(
+        ndvi_array.astype(np.float32, copy=False), pad,
+        mode='constant', constant_values=np.nan
+    )
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True)
+    def _cell_value(padded, i, j, is_codes):
+        """NDVI of one padded cell (NaN if missing)"""
+        value = float(padded[i, j])
+        if is_codes:
+            if value == NDVI_NODATA:
+                return np.nan
+            return value / 254 * 2 - 1
+        return value
+    
+    @numba.njit(parallel=True, cache=True)
+    def _pixel_features_kernel(
+        padded, rows, cols, distances, window_size, is_codes,
+        row_off, col_off, height, width, out
+    ):
+        """Fused window, statistics, distance and position features, one row per pixel"""
+        center = (window_size * window_size) // 2
+        for k in numba.prange(rows.shape[0]):
+            i = rows[k]
+            j = cols[k]
+            
+            # Pass 1: neighbour values, sum, count, min, max
+            total = 0.0
+            count = 0
+            local_min = np.inf
+            local_max = -np.inf
+            col = 0
+            for di in range(window_size):
+                for dj in range(window_size):
+                    value = _cell_value(padded, i + di, j + dj, is_codes)
+                    valid = not np.isnan(value)
+                    if valid:
+                        total += value
+                        count += 1
+                        local_min = min(local_min, value)
+                        local_max = max(local_max, value)
+                    if di * window_size + dj != center:
+                        out[k, col] = value if valid else 0.0
+                        col += 1
+            
+            # Pass 2: deviations from the window mean
+            local_mean = 0.0
+            local_std = 0.0
+            if count > 0:
+                local_mean = total / count
+                squares = 0.0
+                for di in range(window_size):
+                    for dj in range(window_size):
+                        value = _cell_value(padded, i + di, j + dj, is_codes)
+                        if not np.isnan(value):
+                            squares += (value - local_mean) ** 2
+                local_std = np.sqrt(squares / count)
+            else:
+                local_min = 0.0
+                local_max = 0.0
+            
+            out[k, col] = local_mean
+            out[k, col + 1] = local_std
+            out[k, col + 2] = local_min
+            out[k, col + 3] = local_max
+            out[k, col + 4] = distances[k]
+            out[k, col + 5] = (i + row_off) / height
+            out[k, col + 6] = (j + col_off) / width
+
+
+def _window_features(
+    ndvi_array: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    window_size: int
+) -> np.ndarray:
+    """
+    Neighbourhood features of the pixels at (rows, cols)
+    
+    Windows are taken as strided views of the padded array, so only the
+    requested pixels' windows are ever copied (and, for uint8 codes,
+    decoded to float32).
+    
+    Args:
+        ndvi_array: NDVI array (NaN for missing values) or uint8 NDVI codes
+        rows, cols: Pixel coordinates
+        window_size: Size of neighborhood window (odd)
+        
+    Returns:
+        Array of shape (n_pixels, window_size**2 + 3): the neighbour values
+        (centre excluded), then mean, std, min and max of the valid window
+        values (NaN when the window has none)
+    """
+    padded = _pad_missing(ndvi_array, window_size // 2)
+    windows = sliding_window_view(padded, (window_size, window_size))
+    patches = windows[rows, cols].reshape(len(rows), -1)
+    if patches.dtype == np.uint8:
+        patches = _decode_ndvi(patches)
+    
+    # Missing cells count as 0 in the sums; empty windows are left NaN
+    # instead of being divided by zero
+    valid = ~np.isnan(patches)
+    count = valid.sum(axis=1)
+    nonempty = count > 0
+    local_mean = np.divide(
+        np.where(valid, patches, 0.0).sum(axis=1), count,
+        out=np.full(len(count), np.nan), where=nonempty
+    )
+    deviations = np.where(valid, patches - local_mean[:, None], 0.0)
+    np.square(deviations, out=deviations)
+    local_std = np.divide(
+        deviations.sum(axis=1), count,
+        out=np.full(len(count), np.nan), where=nonempty
+    )
+    np.sqrt(local_std, out=local_std)
+    local_min = np.where(valid, patches, np.inf).min(axis=1)
+    local_max = np.where(valid, patches, -np.inf).max(axis=1)
+    local_min[~nonempty] = np.nan
+    local_max[~nonempty] = np.nan
+    
+    neighbor_features = patches[:, _neighbor_index(window_size)]
+    
+    return np.column_stack([neighbor_features, local_mean, local_std, local_min, local_max])
+
+
+def _pixel_features(
+    ndvi_array: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    distances,
+    window_size: int,
+    offset: Tuple[int, int] = (0, 0),
+    image_shape: Optional[Tuple[int, int]] = None
+) -> np.ndarray:
+    """
+    Full float32 feature matrix of the pixels at (rows, cols)
+    
+    Args:
+        ndvi_array: NDVI array (NaN for missing values) or uint8 NDVI codes
+        rows, cols: Pixel coordinates
+        distances: Distance to the nearest valid pixel (array or scalar)
+        window_size: Size of neighborhood window (odd)
+        offset: (row, col) of ndvi_array[0, 0] in the full image, when
+            ndvi_array is a block of it
+        image_shape: (height, width) of the full image (ndvi_array.shape
+            if not given)
+        
+    Returns:
+        Array of shape (n_pixels, window_size**2 + 6): window features,
+        distance, then position in the full image (normalized), NaN
+        replaced by 0
+    """
+    row_off, col_off = offset
+    height, width = image_shape or ndvi_array.shape
+    
+    if NUMBA_AVAILABLE:
+        # One fused pass per pixel, parallel over pixels
+        features = np.empty((len(rows), window_size ** 2 + 6), dtype=np.float32)
+        _pixel_features_kernel(
+            _pad_missing(ndvi_array, window_size // 2),
+            rows.astype(np.int64, copy=False),
+            cols.astype(np.int64, copy=False),
+            np.broadcast_to(np.asarray(distances, dtype=np.float64), rows.shape).copy(),
+            window_size,
+            ndvi_array.dtype == np.uint8,
+            row_off, col_off, height, width,
+            features
+        )
+        return features
+    
+    # Features 1-28: neighbour values and local statistics, all pixels at once
+    local_features = _window_features(ndvi_array, rows, cols, window_size)
+    
+    features = np.empty((len(rows), local_features.shape[1] + 3), dtype=np.float32)
+    features[:, :-3] = local_features
+    features[:, -3] = distances
+    features[:, -2] = (rows + row_off) / height
+    features[:, -1] = (cols + col_off) / width
+    
+    # Replace NaN in features with 0
+    return np.nan_to_num(features, copy=False, nan=0.0)
+
+
+def _distance_to_other_valid(
+    valid_coords: Tuple[np.ndarray, np.ndarray],
+    indices: np.ndarray,
+    window_size: int
+) -> np.ndarray:
+    """
+    Manhattan distance from sampled valid pixels to their nearest other valid pixel
+    
+    A distance transform over the mask would return 0 for every valid pixel,
+    so the second-nearest neighbour of a KD-tree over the valid pixels is used.
+    
+    Args:
+        valid_coords: (rows, cols) of all valid pixels
+        indices: Indices of the sampled pixels into valid_coords
+        window_size: Fallback distance when no other valid pixel exists
+        
+    Returns:
+        Array of distances, one per sampled pixel
+    """
+    points = np.column_stack(valid_coords)
+    distances, _ = cKDTree(points).query(points[indices], k=2, p=1)
+    nearest_other = distances[:, 1]
+    return np.where(np.isfinite(nearest_other), nearest_other, float(window_size))
+
 
 class NDVIGapFiller:
-    """Random Forest-based gap filling for Sentinel-2 NDVI data"""
+    """Gradient boosted tree gap filling for Sentinel-2 NDVI data"""
     
     def __init__(
         self,
-        n_estimators: int = 100,
-        max_depth: int = 20,
-        min_samples_split: int = 5,
-        random_state: int = 42,
-        n_jobs: int = -1
+        max_iter: int = 200,
+        max_depth: int = 8,
+        learning_rate: float = 0.05,
+        random_state: int = 42
     ):
         """
-        Initialize Random Forest gap filler
+        Initialize gradient boosting gap filler
+        
+        Features are binned into 8-bit histograms, so training and prediction
+        are much faster than with a Random Forest of similar accuracy.
         
         Args:
-            n_estimators: Number of trees in the forest
+            max_iter: Maximum number of boosting iterations (trees)
             max_depth: Maximum depth of trees
-            min_samples_split: Minimum samples required to split a node
+            learning_rate: Shrinkage applied to each tree
             random_state: Random seed for reproducibility
-            n_jobs: Number of parallel jobs (-1 = all cores)
         """
-        self.model = RandomForestRegressor(
-            n_estimators=n_estimators,
+        self.model = HistGradientBoostingRegressor(
+            max_iter=max_iter,
             max_depth=max_depth,
-            min_samples_split=min_samples_split,
+            learning_rate=learning_rate,
+            early_stopping=True,
             random_state=random_state,
-            n_jobs=n_jobs,
             verbose=0
         )
         self.is_fitted = False
@@ -58,7 +331,11 @@ class NDVIGapFiller:
         self,
         ndvi_array: np.ndarray,
         nodata_value: float = np.nan,
-        window_size: int = 5
+        window_size: int = 5,
+        missing_mask: Optional[np.ndarray] = None,
+        distance_map: Optional[np.ndarray] = None,
+        offset: Tuple[int, int] = (0, 0),
+        image_shape: Optional[Tuple[int, int]] = None
     ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Extract spatial features for gap filling
@@ -67,11 +344,21 @@ class NDVIGapFiller:
         - Neighboring pixel values (spatial context)
         - Local statistics (mean, std, min, max in window)
         - Distance to nearest valid pixel
+        - Position in image
         
         Args:
             ndvi_array: NDVI array (may contain NaN for missing values)
+                or uint8 NDVI codes (255 for missing values)
             nodata_value: Value representing NoData
             window_size: Size of neighborhood window (must be odd)
+            missing_mask: Boolean mask of missing pixels, derived from
+                ndvi_array if not given
+            distance_map: Manhattan distance of each pixel of ndvi_array to
+                the nearest valid pixel, computed from missing_mask if not
+                given (pass it for blocks of a larger image)
+            offset: (row, col) of ndvi_array[0, 0] in the full image
+            image_shape: (height, width) of the full image (ndvi_array.shape
+                if not given)
             
         Returns:
             Tuple of (features, target_mask) where:
@@ -82,71 +369,33 @@ class NDVIGapFiller:
             raise ValueError("window_size must be odd")
         
         # Create mask for valid and missing pixels
-        valid_mask = ~np.isnan(ndvi_array)
-        missing_mask = np.isnan(ndvi_array)
-        
-        # Pad array for window operations
-        pad = window_size // 2
-        padded = np.pad(ndvi_array, pad, mode='constant', constant_values=np.nan)
+        if missing_mask is None:
+            missing_mask = _missing_mask(ndvi_array)
+        valid_mask = ~missing_mask
         
         # Extract features for missing pixels
-        missing_coords = np.where(missing_mask)
-        n_missing = len(missing_coords[0])
+        rows, cols = np.nonzero(missing_mask)
+        n_missing = len(rows)
         
         if n_missing == 0:
             logger.warning("No missing pixels found")
             return np.array([]), np.array([])
         
-        features = []
-        targets = []
-        
-        for i, j in zip(missing_coords[0], missing_coords[1]):
-            # Get window around pixel (accounting for padding)
-            window = padded[i:i+window_size, j:j+window_size]
-            window_center = window[pad, pad]  # Should be NaN
-            
-            # Feature 1-9: Neighboring pixel values (3x3 window)
-            neighbor_values = window.flatten()
-            neighbor_features = neighbor_values.copy()
-            neighbor_features[pad * window_size + pad] = 0  # Remove center pixel
-            
-            # Feature 10-13: Local statistics (excluding center)
-            window_valid = window[~np.isnan(window)]
-            if len(window_valid) > 0:
-                local_mean = np.nanmean(window_valid)
-                local_std = np.nanstd(window_valid)
-                local_min = np.nanmin(window_valid)
-                local_max = np.nanmax(window_valid)
-            else:
-                local_mean = local_std = local_min = local_max = 0.0
-            
-            # Feature 14: Distance to nearest valid pixel
-            # Use Manhattan distance for efficiency
-            distances = []
-            for vi, vj in zip(*np.where(valid_mask)):
-                dist = abs(vi - i) + abs(vj - j)
-                if dist > 0:
-                    distances.append(dist)
-            min_distance = min(distances) if distances else window_size
-            
-            # Feature 15-16: Position in image (normalized)
-            norm_i = i / ndvi_array.shape[0]
-            norm_j = j / ndvi_array.shape[1]
-            
-            # Combine all features
-            feature_vector = np.concatenate([
-                neighbor_features,  # 9 features
-                [local_mean, local_std, local_min, local_max],  # 4 features
-                [min_distance],  # 1 feature
-                [norm_i, norm_j]  # 2 features
-            ])
-            
-            # Replace NaN in features with 0
-            feature_vector = np.nan_to_num(feature_vector, nan=0.0)
-            
-            features.append(feature_vector)
-        
-        return np.array(features), missing_mask
+        # Feature 29: Distance to nearest valid pixel
+        # Use Manhattan distance for efficiency
+        if distance_map is not None:
+            min_distance = distance_map[rows, cols]
+        elif valid_mask.any():
+            dist_map = distance_transform_cdt(missing_mask, metric='taxicab')
+            min_distance = dist_map[rows, cols]
+        else:
+            min_distance = window_size
+        
+        features = _pixel_features(
+            ndvi_array, rows, cols, min_distance, window_size,
+            offset=offset, image_shape=image_shape
+        )
+        return features, missing_mask
     
     def extract_training_data(
         self,
@@ -172,15 +421,11 @@ class NDVIGapFiller:
         
         for ndvi_array in ndvi_arrays:
             # Create mask for valid pixels
-            valid_mask = ~np.isnan(ndvi_array)
+            valid_mask = ~_missing_mask(ndvi_array)
             
             if np.sum(valid_mask) == 0:
                 continue
             
-            # Pad array
-            pad = window_size // 2
-            padded = np.pad(ndvi_array, pad, mode='constant', constant_values=np.nan)
-            
             # Sample valid pixels for training
             valid_coords = np.where(valid_mask)
             n_valid = len(valid_coords[0])
@@ -188,52 +433,27 @@ class NDVIGapFiller:
             # Sample up to 10000 pixels per image to avoid memory issues
             sample_size = min(10000, n_valid)
             sample_indices = np.random.choice(n_valid, sample_size, replace=False)
+            rows = valid_coords[0][sample_indices]
+            cols = valid_coords[1][sample_indices]
             
-            for idx in sample_indices:
-                i, j = valid_coords[0][idx], valid_coords[1][idx]
-                target_value = ndvi_array[i, j]
-                
-                # Get window
-                window = padded[i:i+window_size, j:j+window_size]
-                
-                # Extract features (same as in extract_features)
-                neighbor_values = window.flatten()
-                neighbor_features = neighbor_values.copy()
-                neighbor_features[pad * window_size + pad] = 0
-                
-                window_valid = window[~np.isnan(window)]
-                if len(window_valid) > 0:
-                    local_mean = np.nanmean(window_valid)
-                    local_std = np.nanstd(window_valid)
-                    local_min = np.nanmin(window_valid)
-                    local_max = np.nanmax(window_valid)
-                else:
-                    local_mean = local_std = local_min = local_max = 0.0
-                
-                # Distance to nearest valid pixel (excluding self)
-                distances = []
-                for vi, vj in zip(*np.where(valid_mask)):
-                    dist = abs(vi - i) + abs(vj - j)
-                    if dist > 0:
-                        distances.append(dist)
-                min_distance = min(distances) if distances else window_size
-                
-                norm_i = i / ndvi_array.shape[0]
-                norm_j = j / ndvi_array.shape[1]
-                
-                feature_vector = np.concatenate([
-                    neighbor_features,
-                    [local_mean, local_std, local_min, local_max],
-                    [min_distance],
-                    [norm_i, norm_j]
-                ])
-                
-                feature_vector = np.nan_to_num(feature_vector, nan=0.0)
-                
-                all_features.append(feature_vector)
-                all_targets.append(target_value)
-        
-        return np.array(all_features), np.array(all_targets)
+            # Distance to nearest valid pixel (excluding self)
+            sample_distances = _distance_to_other_valid(
+                valid_coords, sample_indices, window_size
+            )
+            
+            # Extract features (same as in extract_features)
+            all_features.append(
+                _pixel_features(ndvi_array, rows, cols, sample_distances, window_size)
+            )
+            targets = ndvi_array[rows, cols]
+            if targets.dtype == np.uint8:
+                targets = _decode_ndvi(targets)
+            all_targets.append(targets.astype(np.float32, copy=False))
+        
+        if not all_features:
+            return np.array([], dtype=np.float32), np.array([], dtype=np.float32)
+        
+        return np.concatenate(all_features), np.concatenate(all_targets)
     
     def train(
         self,
@@ -242,7 +462,7 @@ class NDVIGapFiller:
         window_size: int = 5
     ) -> Dict[str, float]:
         """
-        Train the Random Forest model on NDVI data
+        Train the gradient boosting model on NDVI data
         
         Args:
             ndvi_arrays: List of NDVI arrays for training
@@ -252,7 +472,7 @@ class NDVIGapFiller:
         Returns:
             Dictionary with training metrics (R², RMSE)
         """
-        logger.info(f"Training Random Forest gap filler on {len(ndvi_arrays)} NDVI arrays")
+        logger.info(f"Training gradient boosting gap filler on {len(ndvi_arrays)} NDVI arrays")
         
         # Extract training data
         X, y = self.extract_training_data(ndvi_arrays, window_size=window_size)
@@ -268,7 +488,7 @@ class NDVIGapFiller:
         )
         
         # Train model
-        logger.info("Training Random Forest...")
+        logger.info("Training gradient boosting...")
         self.model.fit(X_train, y_train)
         self.is_fitted = True
         
@@ -299,17 +519,27 @@ class NDVIGapFiller:
     def fill_gaps(
         self,
         ndvi_array: np.ndarray,
-        window_size: int = 5
+        window_size: int = 5,
+        missing_mask: Optional[np.ndarray] = None,
+        distance_map: Optional[np.ndarray] = None,
+        offset: Tuple[int, int] = (0, 0),
+        image_shape: Optional[Tuple[int, int]] = None
     ) -> np.ndarray:
         """
         Fill gaps in NDVI array using trained model
         
         Args:
-            ndvi_array: NDVI array with missing values (NaN)
+            ndvi_array: NDVI array with missing values (NaN), or uint8
+                NDVI codes with missing values (255)
             window_size: Size of neighborhood window
+            missing_mask: Boolean mask of pixels to fill, derived from
+                ndvi_array if not given
+            distance_map, offset, image_shape: Full-image context when
+                ndvi_array is a block of a larger image (see
+                extract_features)
             
         Returns:
-            NDVI array with gaps filled
+            NDVI array with gaps filled, in the dtype of ndvi_array
         """
         if not self.is_fitted:
             raise ValueError("Model must be trained before filling gaps")
@@ -318,7 +548,10 @@ class NDVIGapFiller:
         filled_array = ndvi_array.copy()
         
         # Extract features for missing pixels
-        features, missing_mask = self.extract_features(ndvi_array, window_size=window_size)
+        features, missing_mask = self.extract_features(
+            ndvi_array, window_size=window_size, missing_mask=missing_mask,
+            distance_map=distance_map, offset=offset, image_shape=image_shape
+        )
         
         if len(features) == 0:
             logger.info("No gaps to fill")
@@ -326,12 +559,15 @@ class NDVIGapFiller:
         
         # Predict missing values
         logger.info(f"Filling {len(features)} missing pixels...")
-        predictions = self.model.predict(features)
+        predictions = np.empty(len(features), dtype=np.float32)
+        for start in range(0, len(features), PREDICT_CHUNK_SIZE):
+            stop = start + PREDICT_CHUNK_SIZE
+            predictions[start:stop] = self.model.predict(features[start:stop])
         
         # Fill gaps
-        missing_coords = np.where(missing_mask)
-        for idx, (i, j) in enumerate(zip(missing_coords[0], missing_coords[1])):
-            filled_array[i, j] = predictions[idx]
+        if filled_array.dtype == np.uint8:
+            predictions = _encode_ndvi(predictions)
+        filled_array[missing_mask] = predictions
         
         logger.info(f"Filled {len(predictions)} pixels")
         
@@ -351,20 +587,186 @@ class NDVIGapFiller:
         logger.info(f"Model loaded from {path}")
 
 
+def _streamed_distance_map(
+    src: rasterio.DatasetReader,
+    out: np.ndarray,
+    window_size: int
+) -> bool:
+    """
+    Manhattan distance of every pixel to the nearest valid pixel, written to out
+    
+    Equals distance_transform_cdt(missing, metric='taxicab') clipped to
+    MAX_GAP_DISTANCE, without holding the image in memory: the missing mask
+    is read block by block straight into out, and the transform is
+    separable (vertical distances in a downward and an upward row sweep,
+    then a min-plus scan along each row), so only a few rows are decoded
+    at a time.
+    
+    Args:
+        src: Open NDVI raster (uint8 codes)
+        out: uint16 array of the raster's shape, e.g. a disk-backed memmap
+        window_size: Distance given to every pixel when none is valid
+        
+    Returns:
+        True if the raster has missing pixels (out is only filled then)
+    """
+    any_missing = False
+    any_valid = False
+    for _, window in src.block_windows(1):
+        missing = src.read(1, window=window) == NDVI_NODATA
+        any_missing |= bool(missing.any())
+        any_valid |= not missing.all()
+        out[window.toslices()] = np.where(missing, MAX_GAP_DISTANCE, 0)
+    
+    if not any_missing:
+        return False
+    if not any_valid:
+        out[:] = window_size
+        return True
+    
+    height, width = out.shape
+    cols = np.arange(width, dtype=np.int64)
+    
+    # Downward sweep: distance to the nearest valid pixel above, same column
+    above = out[0].astype(np.int64)
+    for i in range(1, height):
+        above = np.minimum(out[i], above + 1)
+        out[i] = above
+    
+    # Upward sweep completes the column distances; each finished row is then
+    # scanned for the nearest column k with cost distance[k] + |j - k|
+    below = out[height - 1].astype(np.int64)
+    for i in range(height - 1, -1, -1):
+        if i < height - 1:
+            below = np.minimum(out[i], below + 1)
+        left = np.minimum.accumulate(below - cols) + cols
+        right = np.minimum.accumulate((below + cols)[::-1])[::-1] - cols
+        out[i] = np.minimum(np.minimum(left, right), MAX_GAP_DISTANCE)
+    
+    return True
+
+
+def _load_ndvi(ndvi_file: Path) -> np.ndarray:
+    """
+    Read a uint8 NDVI GeoTIFF as raw NDVI codes
+    
+    Codes are kept at 1 byte per pixel and only decoded to float NDVI
+    inside the feature windows.
+    
+    Args:
+        ndvi_file: Path to NDVI GeoTIFF
+        
+    Returns:
+        uint8 array (0-254 = NDVI in [-1, 1], 255 = nodata)
+    """
+    with rasterio.open(ndvi_file) as src:
+        return src.read(1)
+
+
+def _fill_one(
+    ndvi_file: Path,
+    gap_filler: NDVIGapFiller,
+    output_dir: Path,
+    window_size: int = 5
+) -> Path:
+    """
+    Fill gaps in one NDVI file and write the result
+    
+    The file is processed block by block along its internal tiling. Each
+    block is read with a halo of window_size // 2 pixels so neighbourhood
+    features are continuous across block edges, and its pixels get the
+    distance to the nearest valid pixel and the position of the whole
+    image, so the result matches filling the image in one pass (for gaps
+    up to MAX_GAP_DISTANCE pixels across). The distance map is kept in a
+    temporary uint16 memmap on disk, read back one block at a time.
+    
+    Args:
+        ndvi_file: Path to NDVI GeoTIFF
+        gap_filler: Trained gap filler
+        output_dir: Directory to save the filled file
+        window_size: Size of neighborhood window
+        
+    Returns:
+        Path to the filled GeoTIFF
+    """
+    logger.info(f"Processing {ndvi_file.name}...")
+    
+    halo = window_size // 2
+    output_path = output_dir / f"filled_{ndvi_file.name}"
+    
+    with rasterio.open(ndvi_file) as src:
+        # Keep the source block layout so output blocks line up with input blocks
+        profile = src.profile.copy()
+        profile.update(
+            driver='GTiff',
+            count=1,
+            dtype='uint8',
+            compress='deflate',
+            predictor=2,
+            nodata=NDVI_NODATA
+        )
+        
+        # Distance to the nearest valid pixel over the whole image (gaps can
+        # be wider than a block and its halo), spilled to a temporary file
+        with tempfile.TemporaryFile() as distance_file:
+            distance_map = np.memmap(
+                distance_file, dtype=np.uint16, mode='w+', shape=(src.height, src.width)
+            )
+            has_gaps = _streamed_distance_map(src, distance_map, window_size)
+            
+            with rasterio.open(output_path, 'w', **profile) as dst:
+                for _, window in src.block_windows(1):
+                    # Read raw uint8 codes with a halo; outside the image is nodata
+                    padded_window = Window(
+                        window.col_off - halo, window.row_off - halo,
+                        window.width + 2 * halo, window.height + 2 * halo
+                    )
+                    raw = src.read(
+                        1, window=padded_window, boundless=True, fill_value=NDVI_NODATA
+                    )
+                    
+                    # Only the block's own gaps are filled; the halo is context
+                    interior = (slice(halo, halo + window.height), slice(halo, halo + window.width))
+                    missing_mask = np.zeros(raw.shape, dtype=bool)
+                    missing_mask[interior] = raw[interior] == NDVI_NODATA
+                    
+                    # Fill gaps, result stays on the uint8 scale
+                    if has_gaps and missing_mask.any():
+                        block_distances = np.zeros(raw.shape, dtype=np.uint16)
+                        block_distances[interior] = distance_map[window.toslices()]
+                        raw = gap_filler.fill_gaps(
+                            raw, window_size=window_size, missing_mask=missing_mask,
+                            distance_map=block_distances,
+                            offset=(padded_window.row_off, padded_window.col_off),
+                            image_shape=(src.height, src.width)
+                        )
+                    
+                    dst.write(raw[interior], 1, window=window)
+            del distance_map
+    
+    logger.info(f"Saved filled NDVI to {output_path}")
+    return output_path
+
+
 def fill_ndvi_gaps_batch(
     input_dir: Path,
     output_dir: Path,
     model_path: Optional[Path] = None,
-    train_on_all: bool = True
+    train_on_all: bool = True,
+    n_jobs: int = -1
 ) -> Path:
     """
     Fill gaps in all NDVI files in a directory
     
+    Tiles are independent, so loading and filling run in parallel worker
+    processes.
+    
     Args:
         input_dir: Directory containing NDVI GeoTIFF files
         output_dir: Directory to save filled NDVI files
         model_path: Optional path to save/load model
         train_on_all: If True, train on all files; if False, use existing model
+        n_jobs: Number of parallel worker processes (-1 = all cores)
         
     Returns:
         Path to output directory
@@ -386,14 +788,9 @@ def fill_ndvi_gaps_batch(
     # Train or load model
     if train_on_all or model_path is None or not model_path.exists():
         # Load all NDVI arrays for training
-        ndvi_arrays = []
-        for ndvi_file in ndvi_files:
-            with rasterio.open(ndvi_file) as src:
-                data = src.read(1).astype(float)
-                # Convert from int8 to float scale
-                data[data == 255] = np.nan
-                data = data / 254 * 2 - 1
-                ndvi_arrays.append(data)
+        ndvi_arrays = Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(_load_ndvi)(ndvi_file) for ndvi_file in ndvi_files
+        )
         
         # Train model
         metrics = gap_filler.train(ndvi_arrays)
@@ -406,43 +803,12 @@ def fill_ndvi_gaps_batch(
         # Load existing model
         gap_filler.load_model(model_path)
     
-    # Fill gaps in all files
-    for ndvi_file in ndvi_files:
-        logger.info(f"Processing {ndvi_file.name}...")
-        
-        with rasterio.open(ndvi_file) as src:
-            # Read and convert NDVI
-            data = src.read(1).astype(float)
-            nodata_mask = data == 255
-            data[data == 255] = np.nan
-            data = data / 254 * 2 - 1
-            
-            # Fill gaps
-            filled_data = gap_filler.fill_gaps(data)
-            
-            # Convert back to int8 scale for storage
-            filled_int8 = ((filled_data + 1) / 2 * 254).astype(np.int8)
-            filled_int8[nodata_mask] = 255  # Preserve original nodata
-            
-            # Write output
-            output_path = output_dir / f"filled_{ndvi_file.name}"
-            with rasterio.open(
-                output_path,
-                'w',
-                driver='GTiff',
-                height=src.height,
-                width=src.width,
-                count=1,
-                dtype=filled_int8.dtype,
-                crs=src.crs,
-                transform=src.transform,
-                compress='lzw',
-                tiled=True,
-                nodata=255
-            ) as dst:
-                dst.write(filled_int8, 1)
-        
-        logger.info(f"Saved filled NDVI to {output_path}")
+    # Fill gaps in all files; the model predicts multi-threaded itself,
+    # so use half the workers to avoid oversubscribing the cores
+    fill_jobs = max(1, (os.cpu_count() or 2) // 2) if n_jobs == -1 else n_jobs
+    Parallel(n_jobs=fill_jobs, backend='loky')(
+        delayed(_fill_one)(ndvi_file, gap_filler, output_dir) for ndvi_file in ndvi_files
+    )
     
     return output_dir
 
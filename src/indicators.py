@@ -9,19 +9,139 @@ Computes climate indicators from temperature data:
 Phase 1: Placeholder calculations on mock data
 """
 
-import json
 import logging
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import numpy as np
 import rasterio
 
 from src.models import Manifest, Indicators
 
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _valid_mask(data: np.ndarray, nodata: Optional[float]) -> np.ndarray:
+    """Finite pixels that are not nodata"""
+    valid = np.isfinite(data)
+    if nodata is not None:
+        valid &= data != nodata
+    return valid
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(parallel=True, cache=True)
+    def _row_statistics(data, nodata, has_nodata, threshold_c, row_max, row_sum, row_count, row_above):
+        """Per-row max, sum, valid count and count above threshold, in one pass"""
+        for r in numba.prange(data.shape[0]):
+            r_max = -np.inf
+            r_sum = 0.0
+            r_count = 0
+            r_above = 0
+            for c in range(data.shape[1]):
+                value = data[r, c]
+                if not np.isfinite(value) or (has_nodata and value == nodata):
+                    continue
+                r_max = max(r_max, value)
+                r_sum += value
+                r_count += 1
+                if value > threshold_c:
+                    r_above += 1
+            row_max[r] = r_max
+            row_sum[r] = r_sum
+            row_count[r] = r_count
+            row_above[r] = r_above
+    
+    @numba.njit(parallel=True, cache=True)
+    def _gather_valid(data, nodata, has_nodata, offsets, out):
+        """Copy each row's valid pixels to out[offsets[r]:]"""
+        for r in numba.prange(data.shape[0]):
+            k = offsets[r]
+            for c in range(data.shape[1]):
+                value = data[r, c]
+                if not np.isfinite(value) or (has_nodata and value == nodata):
+                    continue
+                out[k] = value
+                k += 1
+
+
+def _block_statistics(
+    data: np.ndarray,
+    nodata: Optional[float],
+    threshold_c: float
+) -> Tuple[float, float, int, int, np.ndarray]:
+    """
+    Running-statistics contribution of one block of a temperature raster
+    
+    Args:
+        data: Temperature block
+        nodata: NoData value (NaN and infinities are always invalid)
+        threshold_c: Heat threshold in Celsius
+        
+    Returns:
+        (max, sum, valid_count, pixels_above, valid_values); max is -inf
+        when the block has no valid pixels
+    """
+    if NUMBA_AVAILABLE:
+        # One parallel pass for the reductions, one to gather the valid pixels
+        n_rows = data.shape[0]
+        row_max = np.empty(n_rows)
+        row_sum = np.empty(n_rows)
+        row_count = np.empty(n_rows, dtype=np.int64)
+        row_above = np.empty(n_rows, dtype=np.int64)
+        has_nodata = nodata is not None
+        nodata_value = nodata if has_nodata else 0.0
+        _row_statistics(data, nodata_value, has_nodata, threshold_c, row_max, row_sum, row_count, row_above)
+        offsets = np.concatenate(([0], np.cumsum(row_count)[:-1]))
+        valid_data = np.empty(int(row_count.sum()), dtype=data.dtype)
+        _gather_valid(data, nodata_value, has_nodata, offsets, valid_data)
+        return float(row_max.max()), float(row_sum.sum()), len(valid_data), int(row_above.sum()), valid_data
+    
+    valid_data = data[_valid_mask(data, nodata)]
+    if len(valid_data) == 0:
+        return -np.inf, 0.0, 0, 0, valid_data
+    return (
+        float(valid_data.max()),
+        float(valid_data.sum(dtype=np.float64)),
+        len(valid_data),
+        int(np.count_nonzero(valid_data > threshold_c)),
+        valid_data
+    )
+
+
+def _upper_percentile(top_values: np.ndarray, n_total: int, q: float) -> float:
+    """
+    Percentile (linear interpolation, as np.percentile) from the largest values
+    
+    Args:
+        top_values: The len(top_values) largest of n_total values, sorted
+        n_total: Number of values in the full sample
+        q: Percentile in [0, 100]; its interpolation ranks must fall
+            within top_values
+        
+    Returns:
+        Percentile of the full sample
+    """
+    position = q / 100 * (n_total - 1) - (n_total - len(top_values))
+    lower = int(np.floor(position))
+    upper = min(lower + 1, len(top_values) - 1)
+    fraction = position - lower
+    return float(top_values[lower] + (top_values[upper] - top_values[lower]) * fraction)
+
+
+def _largest(values: np.ndarray, keep: int) -> np.ndarray:
+    """The keep largest values (unordered), or all of them if fewer"""
+    if len(values) <= keep:
+        return values
+    return np.partition(values, len(values) - keep)[-keep:]
+
+
 def compute_indicators_mock(
     temperature_path: Path,
     threshold_c: float = 30.0
@@ -44,19 +164,55 @@ def compute_indicators_mock(
         return Indicators(threshold_c=threshold_c)
     
     with rasterio.open(temperature_path) as src:
-        data = src.read(1)
+        nodata = src.nodata
         
-        # Mask nodata
-        if src.nodata is not None:
-            data_masked = np.ma.masked_equal(data, src.nodata)
-        else:
-            data_masked = np.ma.masked_invalid(data)
+        # Stream the raster block by block with running statistics. Only the
+        # top 5% of pixels (plus interpolation margin) is kept, which is all
+        # the 95th and 99th percentiles need: candidates are collected per
+        # block and compacted only once they exceed twice that, and values
+        # below the last compaction's cutoff are dropped on arrival.
+        keep = int(np.ceil(0.05 * src.width * src.height)) + 2
+        candidates, n_candidates, cutoff = [], 0, -np.inf
+        max_temp, temp_sum, total_pixels, pixels_above = -np.inf, 0.0, 0, 0
+        edges = []
+        for _, window in src.block_windows(1):
+            block = src.read(1, window=window, out_dtype=np.float32)
+            b_max, b_sum, b_count, b_above, b_values = _block_statistics(block, nodata, threshold_c)
+            max_temp = max(max_temp, b_max)
+            temp_sum += b_sum
+            total_pixels += b_count
+            pixels_above += b_above
+            
+            if cutoff > -np.inf:
+                b_values = b_values[b_values >= cutoff]
+            candidates.append(b_values)
+            n_candidates += len(b_values)
+            if n_candidates > 2 * keep:
+                top_values = _largest(np.concatenate(candidates), keep)
+                cutoff = top_values.min()
+                candidates, n_candidates = [top_values], keep
+            
+            # Raster edges, for the urban heat island estimate
+            if window.row_off == 0:
+                edges.append(block[0, :])
+            if window.row_off + window.height == src.height:
+                edges.append(block[-1, :])
+            if window.col_off == 0:
+                edges.append(block[:, 0])
+            if window.col_off + window.width == src.width:
+                edges.append(block[:, -1])
+        
+        if total_pixels == 0:
+            logger.warning(f"No valid pixels in {temperature_path}")
+            return Indicators(threshold_c=threshold_c)
         
         # Basic statistics
-        max_temp = float(data_masked.max())
-        mean_temp = float(data_masked.mean())
-        percentile_95 = float(np.percentile(data_masked.compressed(), 95))
-        percentile_99 = float(np.percentile(data_masked.compressed(), 99))
+        max_temp = float(max_temp)
+        mean_temp = temp_sum / total_pixels
+        top_values = _largest(np.concatenate(candidates), keep)
+        top_values.sort()
+        percentile_95 = _upper_percentile(top_values, total_pixels, 95)
+        percentile_99 = _upper_percentile(top_values, total_pixels, 99)
         
         # Days above threshold (mock: assume single timestep = 1 day if above)
         days_above = 1 if mean_temp > threshold_c else 0
@@ -65,8 +221,6 @@ def compute_indicators_mock(
         intensity = max(0, mean_temp - threshold_c)
         
         # Extent: area with temp > threshold (mock calculation)
-        pixels_above = np.sum(data_masked > threshold_c)
-        total_pixels = data_masked.count()
         extent_ratio = pixels_above / total_pixels if total_pixels > 0 else 0
         
         # Rough area estimate (assume 200m resolution)
@@ -74,14 +228,15 @@ def compute_indicators_mock(
         extent_km2 = extent_ratio * src.width * src.height * pixel_area_km2
         
         # Urban heat island: mock (difference between max and edge values)
-        edge_values = np.concatenate([
-            data_masked[0, :].compressed(),
-            data_masked[-1, :].compressed(),
-            data_masked[:, 0].compressed(),
-            data_masked[:, -1].compressed()
-        ])
-        if len(edge_values) > 0:
-            uhi_intensity = max_temp - float(np.mean(edge_values))
+        # Sum and count the valid pixels of the four edges
+        edge_sum = 0.0
+        edge_count = 0
+        for edge in edges:
+            edge_valid = _valid_mask(edge, nodata)
+            edge_sum += float(np.sum(edge, where=edge_valid, dtype=np.float64))
+            edge_count += int(np.count_nonzero(edge_valid))
+        if edge_count > 0:
+            uhi_intensity = max_temp - edge_sum / edge_count
         else:
             uhi_intensity = 0.0
         
@@ -125,19 +280,19 @@ def indicators_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     
     # Find temperature raster
     if manifest.paths and manifest.paths.intermediate:
-        intermediate_dir = Path(manifest.paths.intermediate.replace("gs://", "/tmp/gcs/"))
+        intermediate_dir = manifest.paths.local_intermediate
         temp_path = intermediate_dir / "t2m_reprojected.tif"
         
         indicators = compute_indicators_mock(temp_path, threshold_c)
         
         # Save indicators
         if manifest.paths.exports:
-            exports_dir = Path(manifest.paths.exports.replace("gs://", "/tmp/gcs/"))
+            exports_dir = manifest.paths.local_exports
             exports_dir.mkdir(parents=True, exist_ok=True)
             
             indicators_path = exports_dir / "indicators.json"
             with open(indicators_path, 'w') as f:
-                json.dump(indicators.to_json(), f, indent=2)
+                f.write(indicators.model_dump_json(indent=2))
             
             logger.info(f"✅ Indicators saved: {indicators_path}")
     else:
@@ -7,13 +7,15 @@ real ERA5/Sentinel-2/OSM data.
 Phase 2+ will implement real data providers.
 """
 
-import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
 import numpy as np
+import numexpr
 import rasterio
-from rasterio.transform import from_bounds
+from rasterio.enums import Resampling
+from rasterio.transform import Affine, from_bounds
 from datetime import datetime
 
 from src.models import Manifest, Tile, Paths
@@ -21,6 +23,113 @@ from src.models import Manifest, Tile, Paths
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seeded PCG64 generator for the synthetic noise. Child generators come
+# from the seed sequence (Generator.spawn needs NumPy >= 1.25)
+_SEED_SEQUENCE = np.random.SeedSequence(20220715)
+_RNG = np.random.default_rng(_SEED_SEQUENCE)
+
+
+class RasterHandle(NamedTuple):
+    """Single-band raster held in memory"""
+    data: np.ndarray
+    transform: Affine
+    crs: str
+    nodata: Optional[float] = None
+
+
+# Mock rasters generated by this process, by output path, so the next stage
+# of the same run can use the pixels without decoding the GeoTIFF again.
+# Entries are handed over once (memory_raster pops them) and dropped at the
+# start of the next ingest, so a long-running worker does not accumulate them.
+_MEMORY_RASTERS: Dict[str, RasterHandle] = {}
+
+
+def memory_raster(path: Path) -> Optional[RasterHandle]:
+    """
+    Take the in-memory copy of a mock raster written by this process
+    
+    The copy is released from the cache: a second call for the same path
+    returns None and the caller reads the GeoTIFF instead.
+    
+    Args:
+        path: GeoTIFF path passed to generate_mock_raster
+        
+    Returns:
+        RasterHandle, or None if the raster was not generated here
+    """
+    return _MEMORY_RASTERS.pop(str(path), None)
+
+
+# Synthetic patterns over the unit grid (xx, yy) with standard normal noise;
+# hotspot = exp(-5 * distance to the center) (urban heat island)
+MOCK_EXPRESSIONS = {
+    # Temperature: warmer in center (urban heat island)
+    "temperature": "25.0 + 8.0 * hotspot + 1.5 * noise",
+    # Relative humidity: inverse of temperature
+    "rh": "60.0 - 15.0 * hotspot + 5.0 * noise",
+    # Wind: some spatial variability
+    "wind": "2.0 + 3.0 * sin(5 * xx) * cos(5 * yy) + 0.5 * noise",
+    # Default: random field
+    "default": "20.0 + 10.0 * (xx + yy) / 2 + 2.0 * noise"
+}
+
+
+def _mock_expression(variable: str) -> str:
+    """numexpr expression of a variable's synthetic pattern"""
+    if variable in ["t2m", "tx", "tn"]:
+        return MOCK_EXPRESSIONS["temperature"]
+    if variable == "rh":
+        return MOCK_EXPRESSIONS["rh"]
+    if variable in ["u10", "v10"]:
+        return MOCK_EXPRESSIONS["wind"]
+    return MOCK_EXPRESSIONS["default"]
+
+
+def _evaluate_mock(
+    variable: str,
+    xx: np.ndarray,
+    yy: np.ndarray,
+    hotspot: np.ndarray,
+    noise: np.ndarray,
+    out: np.ndarray
+) -> np.ndarray:
+    """
+    Evaluate a variable's synthetic pattern into out in one numexpr pass
+    
+    numexpr caches the compiled expression, so repeated calls only run it.
+    
+    Args:
+        variable: Variable name
+        xx, yy, hotspot, noise: float32 input arrays
+        out: float32 output array
+        
+    Returns:
+        out
+    """
+    return numexpr.evaluate(
+        _mock_expression(variable),
+        local_dict={"xx": xx, "yy": yy, "hotspot": hotspot, "noise": noise},
+        out=out,
+        casting='same_kind'
+    )
+
+
+def _mock_grid(width: int, height: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Unit grid and center hotspot shared by all mock variables of a shape
+    
+    Args:
+        width, height: Raster dimensions
+        
+    Returns:
+        (xx, yy, hotspot) float32 arrays of shape (height, width)
+    """
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)
+    xx, yy = np.meshgrid(x, y)
+    hotspot = numexpr.evaluate("exp(-5 * sqrt((xx - 0.5)**2 + (yy - 0.5)**2))")
+    return xx, yy, hotspot.astype(np.float32)
+
 
 def generate_mock_raster(
     output_path: Path,
@@ -28,7 +137,11 @@ def generate_mock_raster(
     height: int = 128,
     bbox: tuple = (2.224, 48.815, 2.470, 48.902),
     variable: str = "t2m",
-    crs: str = "EPSG:4326"
+    crs: str = "EPSG:4326",
+    overview_levels: Optional[List[int]] = None,
+    rng: Optional[np.random.Generator] = None,
+    grid_cache: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+    transform: Optional[Affine] = None
 ) -> Path:
     """
     Generate a synthetic raster with realistic spatial patterns
@@ -39,38 +152,29 @@ def generate_mock_raster(
         bbox: Bounding box (minx, miny, maxx, maxy)
         variable: Variable name (affects pattern)
         crs: Coordinate reference system
+        overview_levels: Optional decimation factors of internal overviews
+            (e.g. [2, 4, 8]) for fast low-resolution reads
+        rng: Random generator for the noise (default: module generator)
+        grid_cache: Precomputed (xx, yy, hotspot) from _mock_grid(width, height)
+        transform: Precomputed from_bounds(*bbox, width, height)
         
     Returns:
-        Path to created GeoTIFF
+        Path to created GeoTIFF (its pixels are also kept for memory_raster)
     """
     logger.info(f"Generating mock raster: {variable} ({width}x{height})")
     
     # Create synthetic data with spatial pattern
-    x = np.linspace(0, 1, width)
-    y = np.linspace(0, 1, height)
-    xx, yy = np.meshgrid(x, y)
-    
-    # Base gradient + urban heat island effect (center hotspot)
-    center_x, center_y = 0.5, 0.5
-    dist = np.sqrt((xx - center_x)**2 + (yy - center_y)**2)
+    xx, yy, hotspot = grid_cache or _mock_grid(width, height)
+    noise = (rng or _RNG).standard_normal((height, width), dtype=np.float32)
     
-    if variable in ["t2m", "tx", "tn"]:
-        # Temperature: warmer in center (urban heat island)
-        base_temp = 25.0 + 8.0 * np.exp(-5 * dist)
-        noise = np.random.normal(0, 1.5, (height, width))
-        data = base_temp + noise
-    elif variable == "rh":
-        # Relative humidity: inverse of temperature
-        data = 60.0 - 15.0 * np.exp(-5 * dist) + np.random.normal(0, 5, (height, width))
-    elif variable in ["u10", "v10"]:
-        # Wind: some spatial variability
-        data = 2.0 + 3.0 * np.sin(5 * xx) * np.cos(5 * yy) + np.random.normal(0, 0.5, (height, width))
-    else:
-        # Default: random field
-        data = 20.0 + 10.0 * (xx + yy) / 2 + np.random.normal(0, 2, (height, width))
+    # Whole pattern (gradient, center hotspot, noise) in one fused pass,
+    # written straight into a float32 array
+    data = np.empty((height, width), dtype=np.float32)
+    _evaluate_mock(variable, xx, yy, hotspot, noise, out=data)
     
     # Affine transform from bounds
-    transform = from_bounds(*bbox, width, height)
+    if transform is None:
+        transform = from_bounds(*bbox, width, height)
     
     # Write GeoTIFF
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -84,11 +188,21 @@ def generate_mock_raster(
         dtype=data.dtype,
         crs=crs,
         transform=transform,
-        compress='lzw',
+        # Floating-point predictor; fast deflate level for scratch rasters
+        compress='deflate',
+        predictor=3,
+        zlevel=1,
+        num_threads='all_cpus',
         tiled=True
     ) as dst:
-        dst.write(data.astype('float32'), 1)
+        dst.write(data, 1)
         dst.set_band_description(1, variable)
+        
+        if overview_levels:
+            dst.build_overviews(overview_levels, Resampling.average)
+            dst.update_tags(ns='rio_overview', resampling='average')
+    
+    _MEMORY_RASTERS[str(output_path)] = RasterHandle(data, transform, crs)
     
     logger.info(f"✅ Created mock raster: {output_path}")
     return output_path
@@ -114,26 +228,44 @@ def ingest_mock_data(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     
     # Create output directory (local or GCS)
     if manifest.paths and manifest.paths.raw:
-        output_dir = Path(manifest.paths.raw.replace("gs://", "/tmp/gcs/"))
+        output_dir = manifest.paths.local_raw
     else:
         output_dir = Path(f"/tmp/genhack/raw/{manifest.city}")
     
     output_dir.mkdir(parents=True, exist_ok=True)
     
+    # Rasters of a previous run that no stage consumed
+    _MEMORY_RASTERS.clear()
+    
     # Generate mock rasters for each variable
     bbox = config.get("extent", {}).get("bbox_wgs84", [2.224, 48.815, 2.470, 48.902])
+    overview_levels = config.get("ingest", {}).get("overview_levels", [2, 4, 8])
+    
+    # Variables are independent: generate them concurrently (numexpr and
+    # libtiff compression release the GIL). Each variable gets its own
+    # child generator so the noise does not depend on thread scheduling.
+    variables = list(manifest.variables)
+    rngs = [np.random.default_rng(seed) for seed in _SEED_SEQUENCE.spawn(len(variables))]
+    grid_cache = _mock_grid(128, 128)
+    transform = from_bounds(*bbox, 128, 128)
     
-    for variable in manifest.variables:
-        output_path = output_dir / f"{variable}_mock.tif"
-        generate_mock_raster(
-            output_path=output_path,
+    def generate(variable: str, rng: np.random.Generator) -> Path:
+        return generate_mock_raster(
+            output_path=output_dir / f"{variable}_mock.tif",
             width=128,
             height=128,
             bbox=tuple(bbox),
             variable=variable,
-            crs="EPSG:4326"
+            crs="EPSG:4326",
+            overview_levels=overview_levels,
+            rng=rng,
+            grid_cache=grid_cache,
+            transform=transform
         )
     
+    with ThreadPoolExecutor(max_workers=max(1, len(variables))) as executor:
+        list(executor.map(generate, variables, rngs))
+    
     # Update manifest
     manifest.stage = "ingest"
     manifest.paths = Paths(
@@ -146,7 +278,7 @@ def ingest_mock_data(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     # Save manifest
     manifest_path = output_dir / "manifest.json"
     with open(manifest_path, 'w') as f:
-        json.dump(manifest.to_json(), f, indent=2)
+        f.write(manifest.model_dump_json(indent=2))
     
     logger.info(f"✅ Ingest complete: {len(manifest.variables)} variables")
     logger.info(f"   Output: {output_dir}")
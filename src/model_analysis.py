@@ -10,9 +10,16 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import json
 import numpy as np
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 try:
     import torch
     import matplotlib.pyplot as plt
@@ -36,7 +43,28 @@ class ModelAnalyzer:
         self.model_dir = Path(model_dir)
         self.results_dir = Path(results_dir)
         self.results_dir.mkdir(parents=True, exist_ok=True)
+        self._history_cache: Dict[Tuple[str, float], Dict] = {}
         
+    def _load_history(self, history_path: Path) -> Dict:
+        """
+        Parse a training history JSON, memoized per file version
+        
+        Args:
+            history_path: Path to training history JSON
+            
+        Returns:
+            Parsed history (shared, must not be mutated)
+        """
+        history_path = Path(history_path)
+        key = (str(history_path.resolve()), history_path.stat().st_mtime)
+        if key not in self._history_cache:
+            if ORJSON_AVAILABLE:
+                self._history_cache[key] = orjson.loads(history_path.read_bytes())
+            else:
+                with open(history_path, 'r') as f:
+                    self._history_cache[key] = json.load(f)
+        return self._history_cache[key]
+    
     def analyze_training_history(
         self,
         history_path: Path
@@ -52,66 +80,67 @@ class ModelAnalyzer:
         """
         logger.info("Analyzing training history...")
         
-        with open(history_path, 'r') as f:
-            history = json.load(f)
+        history = self._load_history(history_path)
         
         train_losses = history.get('train_loss', [])
         val_losses = history.get('val_loss', [])
         
+        # Convert once for the vectorized checks and plotting
+        train_array = np.asarray(train_losses, dtype=np.float64)
+        val_array = np.asarray(val_losses, dtype=np.float64)
+        best_idx = int(np.argmin(val_array)) if val_array.size else None
+        
         analysis = {
             'final_train_loss': train_losses[-1] if train_losses else None,
             'final_val_loss': val_losses[-1] if val_losses else None,
-            'best_val_loss': min(val_losses) if val_losses else None,
-            'best_epoch': val_losses.index(min(val_losses)) if val_losses else None,
-            'convergence_epoch': self._detect_convergence(val_losses),
-            'overfitting_detected': self._detect_overfitting(train_losses, val_losses)
+            'best_val_loss': val_losses[best_idx] if best_idx is not None else None,
+            'best_epoch': best_idx,
+            'convergence_epoch': self._detect_convergence(val_array),
+            'overfitting_detected': self._detect_overfitting(train_array, val_array)
         }
         
         # Plot training curves if matplotlib available
         if MATPLOTLIB_AVAILABLE and train_losses and val_losses:
-            self._plot_training_curves(train_losses, val_losses)
+            self._plot_training_curves(train_array, val_array)
         
         logger.info(f"Training analysis complete: Best val loss = {analysis['best_val_loss']:.4f}")
         return analysis
     
-    def _detect_convergence(self, losses: List[float], patience: int = 5) -> Optional[int]:
+    def _detect_convergence(self, losses: np.ndarray, patience: int = 5) -> Optional[int]:
         """Detect convergence epoch (no improvement for patience epochs)"""
-        if len(losses) < patience + 1:
+        losses = np.asarray(losses)
+        if losses.size < patience + 1:
             return None
         
-        best_loss = min(losses)
-        best_idx = losses.index(best_loss)
+        best_idx = int(np.argmin(losses))
         
         # Check if no improvement after best epoch
-        if best_idx + patience < len(losses):
+        if best_idx + patience < losses.size:
             subsequent_losses = losses[best_idx + 1:best_idx + patience + 1]
-            if all(loss >= best_loss * 1.01 for loss in subsequent_losses):  # 1% tolerance
+            if np.all(subsequent_losses >= losses[best_idx] * 1.01):  # 1% tolerance
                 return best_idx + patience
         
         return None
     
     def _detect_overfitting(
         self,
-        train_losses: List[float],
-        val_losses: List[float]
+        train_losses: np.ndarray,
+        val_losses: np.ndarray
     ) -> bool:
         """Detect overfitting (val loss increasing while train loss decreasing)"""
-        if len(train_losses) < 3 or len(val_losses) < 3:
+        if train_losses.size < 3 or val_losses.size < 3:
             return False
         
         # Check last 3 epochs
-        recent_train = train_losses[-3:]
-        recent_val = val_losses[-3:]
-        
-        train_decreasing = recent_train[0] > recent_train[-1]
-        val_increasing = recent_val[0] < recent_val[-1]
+        train_decreasing = train_losses[-3] > train_losses[-1]
+        val_increasing = val_losses[-3] < val_losses[-1]
         
-        return train_decreasing and val_increasing
+        return bool(train_decreasing and val_increasing)
     
     def _plot_training_curves(
         self,
-        train_losses: List[float],
-        val_losses: List[float]
+        train_losses: np.ndarray,
+        val_losses: np.ndarray
     ):
         """Plot training and validation loss curves"""
         plt.figure(figsize=(10, 6))
@@ -153,36 +182,38 @@ class ModelAnalyzer:
         """
         logger.info(f"Performing {n_folds}-fold spatial cross-validation...")
         
-        unique_groups = np.unique(spatial_groups)
-        np.random.shuffle(unique_groups)
+        # Shuffle the groups once and map every sample to its fold; the
+        # last fold takes the remainder of the groups
+        unique_groups, group_index = np.unique(spatial_groups, return_inverse=True)
+        n_groups = len(unique_groups)
+        fold_size = n_groups // n_folds
         
-        fold_size = len(unique_groups) // n_folds
-        cv_scores = []
+        position = np.empty(n_groups, dtype=np.int64)
+        position[np.random.permutation(n_groups)] = np.arange(n_groups)
+        if fold_size > 0:
+            group_fold = np.minimum(position // fold_size, n_folds - 1)
+        else:
+            group_fold = np.full(n_groups, n_folds - 1)
+        sample_fold = group_fold[group_index.ravel()]
         
-        for fold in range(n_folds):
-            start_idx = fold * fold_size
-            end_idx = start_idx + fold_size if fold < n_folds - 1 else len(unique_groups)
-            
-            test_groups = unique_groups[start_idx:end_idx]
-            train_groups = np.setdiff1d(unique_groups, test_groups)
-            
-            # Split data
-            test_mask = np.isin(spatial_groups, test_groups)
-            train_mask = np.isin(spatial_groups, train_groups)
-            
-            test_pred = predictions[test_mask]
-            test_true = ground_truth[test_mask]
-            
-            # Calculate metrics for this fold
-            rmse = np.sqrt(np.mean((test_pred - test_true) ** 2))
-            mae = np.mean(np.abs(test_pred - test_true))
-            
-            cv_scores.append({
+        # Per-fold error sums in one sweep over the samples
+        errors = (np.asarray(predictions) - np.asarray(ground_truth)).ravel()
+        fold_counts = np.bincount(sample_fold, minlength=n_folds)
+        fold_sq_errors = np.bincount(sample_fold, weights=errors * errors, minlength=n_folds)
+        fold_abs_errors = np.bincount(sample_fold, weights=np.abs(errors), minlength=n_folds)
+        with np.errstate(invalid='ignore', divide='ignore'):  # empty folds
+            fold_rmse = np.sqrt(fold_sq_errors / fold_counts)
+            fold_mae = fold_abs_errors / fold_counts
+        
+        cv_scores = [
+            {
                 'fold': fold + 1,
-                'rmse': rmse,
-                'mae': mae,
-                'n_test_samples': len(test_pred)
-            })
+                'rmse': fold_rmse[fold],
+                'mae': fold_mae[fold],
+                'n_test_samples': int(fold_counts[fold])
+            }
+            for fold in range(n_folds)
+        ]
         
         # Aggregate results
         mean_rmse = np.mean([s['rmse'] for s in cv_scores])
@@ -217,43 +248,31 @@ class ModelAnalyzer:
         """
         logger.info("Analyzing hyperparameter sensitivity...")
         
-        # Extract hyperparameters and metrics
-        analysis = {
-            'learning_rate': {},
-            'lora_r': {},
-            'batch_size': {}
-        }
-        
-        for result in results:
-            lr = result.get('learning_rate')
-            lora_r = result.get('lora_r')
-            batch = result.get('batch_size')
-            val_loss = result.get('val_loss')
+        analysis = {}
+        for param_name in ['learning_rate', 'lora_r', 'batch_size']:
+            # Runs that report both the hyperparameter and a validation loss
+            runs = pd.DataFrame(
+                [
+                    (result.get(param_name), result.get('val_loss'))
+                    for result in results
+                    if result.get(param_name) and result.get('val_loss')
+                ],
+                columns=['value', 'val_loss']
+            )
             
-            if lr and val_loss:
-                if lr not in analysis['learning_rate']:
-                    analysis['learning_rate'][lr] = []
-                analysis['learning_rate'][lr].append(val_loss)
-            
-            if lora_r and val_loss:
-                if lora_r not in analysis['lora_r']:
-                    analysis['lora_r'][lora_r] = []
-                analysis['lora_r'][lora_r].append(val_loss)
-            
-            if batch and val_loss:
-                if batch not in analysis['batch_size']:
-                    analysis['batch_size'][batch] = []
-                analysis['batch_size'][batch].append(val_loss)
-        
-        # Compute means
-        for param_name in analysis:
-            for param_value in analysis[param_name]:
-                losses = analysis[param_name][param_value]
-                analysis[param_name][param_value] = {
-                    'mean': np.mean(losses),
-                    'std': np.std(losses),
-                    'n_runs': len(losses)
+            # Loss statistics per hyperparameter value, in order of appearance
+            losses = runs.groupby('value', sort=False)['val_loss']
+            means = losses.mean()
+            stds = losses.std(ddof=0)
+            counts = losses.size()
+            analysis[param_name] = {
+                value: {
+                    'mean': means[value],
+                    'std': stds[value],
+                    'n_runs': int(counts[value])
                 }
+                for value in means.index
+            }
         
         return analysis
     
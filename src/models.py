@@ -4,52 +4,92 @@ Pydantic models matching JSON schemas for type safety
 """
 
 from datetime import datetime
+from functools import cached_property, lru_cache
+from pathlib import Path
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+
+@lru_cache(maxsize=256)
+def local_path(uri: str) -> Path:
+    """Map a gs:// URI to its local mirror under /tmp/gcs (other paths unchanged)"""
+    if uri.startswith("gs://"):
+        return Path("/tmp/gcs/" + uri.removeprefix("gs://"))
+    return Path(uri)
 
 
 class Period(BaseModel):
     """Time period for analysis"""
+    model_config = ConfigDict(frozen=True)
+
     start: str = Field(..., description="Start date (YYYY-MM-DD)")
     end: str = Field(..., description="End date (YYYY-MM-DD)")
 
 
 class Grid(BaseModel):
     """Target grid specification"""
+    model_config = ConfigDict(frozen=True)
+
     crs: str = Field(..., description="Coordinate reference system")
     resolution_m: float = Field(..., description="Spatial resolution in meters")
 
 
 class Tile(BaseModel):
     """Spatial tile for large area processing"""
+    model_config = ConfigDict(frozen=True)
+
     id: str
     bbox: List[float] = Field(..., min_items=4, max_items=4)
 
 
 class Mode(BaseModel):
     """Processing mode configuration"""
+    model_config = ConfigDict(frozen=True)
+
     dry_run: bool = False
 
 
 class Paths(BaseModel):
     """GCS paths to pipeline data"""
+    model_config = ConfigDict(frozen=True)
+
     raw: Optional[str] = None
     intermediate: Optional[str] = None
     features: Optional[str] = None
     exports: Optional[str] = None
 
+    @cached_property
+    def local_raw(self) -> Optional[Path]:
+        """Local directory of the raw data"""
+        return local_path(self.raw) if self.raw is not None else None
+
+    @cached_property
+    def local_intermediate(self) -> Optional[Path]:
+        """Local directory of the intermediate data"""
+        return local_path(self.intermediate) if self.intermediate is not None else None
+
+    @cached_property
+    def local_features(self) -> Optional[Path]:
+        """Local directory of the features"""
+        return local_path(self.features) if self.features is not None else None
+
+    @cached_property
+    def local_exports(self) -> Optional[Path]:
+        """Local directory of the exports"""
+        return local_path(self.exports) if self.exports is not None else None
+
 
 class Manifest(BaseModel):
     """Pipeline manifest - passed between stages"""
     city: str
     period: Period
     grid: Grid
-    tiles: List[Tile] = []
+    tiles: List[Tile] = Field(default_factory=list)
     variables: List[str]
     created_at: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
     stage: str
-    mode: Optional[Mode] = Mode()
-    paths: Optional[Paths] = Paths()
+    mode: Optional[Mode] = Field(default_factory=Mode)
+    paths: Optional[Paths] = Field(default_factory=Paths)
 
     def to_json(self) -> Dict[str, Any]:
         """Export to JSON-serializable dict"""
@@ -58,6 +98,8 @@ class Manifest(BaseModel):
 
 class Bounds(BaseModel):
     """Geographic bounds"""
+    model_config = ConfigDict(frozen=True)
+
     minx: float
     miny: float
     maxx: float
@@ -77,6 +119,8 @@ class RasterMetadata(BaseModel):
     bounds: Optional[Bounds] = None
     band_count: Optional[int] = 1
     band_names: Optional[List[str]] = None
+    scale_factor: Optional[float] = None
+    add_offset: Optional[float] = None
 
     def to_json(self) -> Dict[str, Any]:
         """Export to JSON-serializable dict"""
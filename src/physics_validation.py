@@ -11,16 +11,354 @@ Validates physical consistency of downscaled predictions:
 import numpy as np
 from typing import Dict, Tuple, Optional
 import logging
+import warnings
 
 logger = logging.getLogger(__name__)
 
 try:
-    from scipy import stats
+    from scipy import special
     SCIPY_AVAILABLE = True
 except ImportError:
     SCIPY_AVAILABLE = False
     logger.warning("scipy not available. Install with: pip install scipy")
 
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Without numba, correlations over larger rasters are estimated from a
+# seeded uniform sample
+CORRELATION_SAMPLE_THRESHOLD = 1_000_000
+CORRELATION_SAMPLE_SIZE = 200_000
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(parallel=True, cache=True)
+    def _pearson_sums(x, y):
+        """
+        Count and sums of the pairs that are both finite, in one pass
+        
+        Takes 2D arrays of any strides and reduces them row by row in
+        parallel. Values are shifted by the first valid pair, which keeps
+        the one-pass co-moments accurate for data far from zero.
+        """
+        shift_x = 0.0
+        shift_y = 0.0
+        found = False
+        for r in range(x.shape[0]):
+            for c in range(x.shape[1]):
+                if np.isfinite(x[r, c]) and np.isfinite(y[r, c]):
+                    shift_x = x[r, c]
+                    shift_y = y[r, c]
+                    found = True
+                    break
+            if found:
+                break
+        
+        n = 0
+        sum_x = 0.0
+        sum_y = 0.0
+        sum_xx = 0.0
+        sum_yy = 0.0
+        sum_xy = 0.0
+        for r in numba.prange(x.shape[0]):
+            r_n = 0
+            r_x = 0.0
+            r_y = 0.0
+            r_xx = 0.0
+            r_yy = 0.0
+            r_xy = 0.0
+            for c in range(x.shape[1]):
+                xi = x[r, c] - shift_x
+                yi = y[r, c] - shift_y
+                if np.isfinite(xi) and np.isfinite(yi):
+                    r_n += 1
+                    r_x += xi
+                    r_y += yi
+                    r_xx += xi * xi
+                    r_yy += yi * yi
+                    r_xy += xi * yi
+            n += r_n
+            sum_x += r_x
+            sum_y += r_y
+            sum_xx += r_xx
+            sum_yy += r_yy
+            sum_xy += r_xy
+        return n, sum_x, sum_y, sum_xx, sum_yy, sum_xy
+    
+    @numba.njit(parallel=True, cache=True)
+    def _gradient_statistics(data, row_max, row_sum, row_count):
+        """
+        Per-row max, sum and count of the non-NaN gradient magnitudes
+        
+        Same stencil as np.gradient: central differences inside, one-sided
+        differences on the borders (at least 2 rows and 2 columns).
+        """
+        n_rows, n_cols = data.shape
+        for r in numba.prange(n_rows):
+            r_max = -np.inf
+            r_sum = 0.0
+            r_count = 0
+            for c in range(n_cols):
+                if c == 0:
+                    grad_x = data[r, 1] - data[r, 0]
+                elif c == n_cols - 1:
+                    grad_x = data[r, c] - data[r, c - 1]
+                else:
+                    grad_x = (data[r, c + 1] - data[r, c - 1]) / 2.0
+                if r == 0:
+                    grad_y = data[1, c] - data[0, c]
+                elif r == n_rows - 1:
+                    grad_y = data[r, c] - data[r - 1, c]
+                else:
+                    grad_y = (data[r + 1, c] - data[r - 1, c]) / 2.0
+                magnitude = np.sqrt(grad_x * grad_x + grad_y * grad_y)
+                if np.isnan(magnitude):
+                    continue
+                r_max = max(r_max, magnitude)
+                r_sum += magnitude
+                r_count += 1
+            row_max[r] = r_max
+            row_sum[r] = r_sum
+            row_count[r] = r_count
+    
+    @numba.njit(parallel=True, cache=True)
+    def _row_moments(data, row_min, row_max, row_count, row_mean, row_m2):
+        """
+        Per-row min, max, count, mean and centered sum of squares, ignoring NaN
+        
+        The centered pass re-reads a row while it is still in cache, so the
+        raster is streamed from memory once.
+        """
+        for r in numba.prange(data.shape[0]):
+            r_min = np.inf
+            r_max = -np.inf
+            r_sum = 0.0
+            r_count = 0
+            for c in range(data.shape[1]):
+                value = data[r, c]
+                if np.isnan(value):
+                    continue
+                r_min = min(r_min, value)
+                r_max = max(r_max, value)
+                r_sum += value
+                r_count += 1
+            r_mean = r_sum / r_count if r_count > 0 else 0.0
+            r_m2 = 0.0
+            for c in range(data.shape[1]):
+                value = data[r, c]
+                if np.isnan(value):
+                    continue
+                r_m2 += (value - r_mean) * (value - r_mean)
+            row_min[r] = r_min
+            row_max[r] = r_max
+            row_count[r] = r_count
+            row_mean[r] = r_mean
+            row_m2[r] = r_m2
+    
+    @numba.njit(parallel=True, nogil=True, cache=True)
+    def _ndbi_kernel(first, second, eps, out):
+        """Clipped normalized difference (first - second) / (first + second + eps)"""
+        zero = eps - eps
+        for i in numba.prange(out.size):
+            # Adding a float zero converts integer bands before the difference,
+            # so unsigned bands cannot wrap around; floats are unchanged
+            a = first[i] + zero
+            b = second[i] + zero
+            value = (a - b) / (a + b + eps)
+            if value < -1:
+                value = -1
+            elif value > 1:
+                value = 1
+            out[i] = value
+
+
+def _correlation_from_moments(
+    covariance: float,
+    variance_x: float,
+    variance_y: float,
+    n: int
+) -> Tuple[float, float]:
+    """
+    Pearson's r and its two-sided p-value from centered co-moments
+    
+    Args:
+        covariance: Sum of the centered cross products
+        variance_x, variance_y: Sums of the centered squares
+        n: Number of pairs (at least 2)
+        
+    Returns:
+        (correlation, p-value); NaN for a constant input
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.sqrt(variance_x * variance_y)
+    correlation = np.clip(correlation, -1.0, 1.0)
+    
+    # Student t with n - 2 degrees of freedom
+    if n > 2:
+        with np.errstate(divide='ignore'):
+            t = correlation * np.sqrt((n - 2) / (1.0 - correlation * correlation))
+        p_value = 2 * special.stdtr(n - 2, -np.abs(t))
+    else:
+        p_value = np.float64(1.0)
+    return correlation, p_value
+
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> Tuple[float, float, int]:
+    """
+    Pearson correlation over the pixels where both arrays are finite
+    
+    Args:
+        x, y: Arrays of the same size (2D arrays of the same shape are
+            read in place, whatever their strides)
+        
+    Returns:
+        (correlation, two-sided p-value, number of valid pairs)
+        
+    Without numba, inputs with more than CORRELATION_SAMPLE_THRESHOLD pixels
+    are reduced to CORRELATION_SAMPLE_SIZE pixels drawn uniformly without
+    replacement (fixed seed, so results are reproducible); the p-value and
+    the pair count then refer to the sample, not the full raster. The JIT
+    kernel streams the full raster faster than a sample can be drawn.
+    """
+    if not NUMBA_AVAILABLE:
+        if x.size > CORRELATION_SAMPLE_THRESHOLD:
+            rng = np.random.default_rng(0)
+            idx = np.sort(rng.choice(x.size, CORRELATION_SAMPLE_SIZE, replace=False))
+            x = x[np.unravel_index(idx, x.shape)]
+            y = y[np.unravel_index(idx, y.shape)]
+        x = x.ravel()
+        y = y.ravel()
+        valid_mask = np.isfinite(x)
+        np.logical_and(valid_mask, np.isfinite(y), out=valid_mask)
+        x_valid = x[valid_mask].astype(np.float64, copy=False)
+        y_valid = y[valid_mask].astype(np.float64, copy=False)
+        n = len(x_valid)
+        if n < 2:
+            return np.nan, np.nan, n
+        
+        x_valid -= x_valid.mean()
+        y_valid -= y_valid.mean()
+        correlation, p_value = _correlation_from_moments(
+            x_valid @ y_valid, x_valid @ x_valid, y_valid @ y_valid, n
+        )
+        return correlation, p_value, n
+    
+    # The kernel reads 2D views directly; anything else is viewed as one row
+    # (a copy only when the input is not contiguous)
+    if x.ndim != 2 or x.shape != y.shape:
+        x = x.reshape(1, -1)
+        y = y.reshape(1, -1)
+    n, sum_x, sum_y, sum_xx, sum_yy, sum_xy = _pearson_sums(x, y)
+    if n < 2:
+        return np.nan, np.nan, n
+    
+    correlation, p_value = _correlation_from_moments(
+        sum_xy - sum_x * sum_y / n,
+        sum_xx - sum_x * sum_x / n,
+        sum_yy - sum_y * sum_y / n,
+        n
+    )
+    return correlation, p_value, n
+
+
+def _float_dtype(dtype: np.dtype) -> np.dtype:
+    """
+    Floating-point dtype able to hold the values of an array dtype
+    
+    Float dtypes (float32 included) are kept; 8/16-bit integers, which
+    float32 represents exactly, map to float32 and wider integers to float64.
+    """
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.floating):
+        return dtype
+    if dtype.itemsize <= 2:
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def _as_float(data: np.ndarray) -> np.ndarray:
+    """
+    Floating-point view of an array for the kernels
+    
+    Float arrays are passed through, integers are converted to their
+    _float_dtype. The kernels accumulate in float64 whatever the input
+    precision.
+    """
+    dtype = _float_dtype(data.dtype)
+    if data.dtype == dtype:
+        return data
+    return data.astype(dtype)
+
+
+def _gradient_magnitude_statistics(temperature: np.ndarray) -> Tuple[float, float]:
+    """
+    Max and mean of the np.gradient magnitude, ignoring NaN
+    
+    Args:
+        temperature: 2D temperature array
+        
+    Returns:
+        (max_gradient, mean_gradient), NaN when no magnitude is valid
+    """
+    if not NUMBA_AVAILABLE or min(temperature.shape) < 2:
+        grad_y, grad_x = np.gradient(temperature)
+        grad_magnitude = np.sqrt(grad_x**2 + grad_y**2)
+        return np.nanmax(grad_magnitude), np.nanmean(grad_magnitude)
+    
+    # One sweep, without the gradient and magnitude arrays
+    temperature = _as_float(temperature)
+    n_rows = temperature.shape[0]
+    row_max = np.empty(n_rows)
+    row_sum = np.empty(n_rows)
+    row_count = np.empty(n_rows, dtype=np.int64)
+    _gradient_statistics(temperature, row_max, row_sum, row_count)
+    
+    count = row_count.sum()
+    if count == 0:
+        return np.float64(np.nan), np.float64(np.nan)
+    return row_max.max(), row_sum.sum() / count
+
+
+def _temperature_statistics(temperature: np.ndarray) -> Tuple[float, float, float, float]:
+    """
+    NaN-ignoring min, max, mean and (population) std in one sweep
+    
+    Args:
+        temperature: Temperature array
+        
+    Returns:
+        (min, max, mean, std), NaN when no value is valid
+    """
+    if not NUMBA_AVAILABLE or temperature.size == 0:
+        return (
+            np.nanmin(temperature),
+            np.nanmax(temperature),
+            np.nanmean(temperature),
+            np.nanstd(temperature)
+        )
+    
+    temperature = _as_float(temperature)
+    data = temperature.reshape(temperature.shape[0] if temperature.ndim > 1 else 1, -1)
+    n_rows = data.shape[0]
+    row_min = np.empty(n_rows)
+    row_max = np.empty(n_rows)
+    row_count = np.empty(n_rows, dtype=np.int64)
+    row_mean = np.empty(n_rows)
+    row_m2 = np.empty(n_rows)
+    _row_moments(data, row_min, row_max, row_count, row_mean, row_m2)
+    
+    count = row_count.sum()
+    if count == 0:
+        return (np.float64(np.nan),) * 4
+    
+    # Combine the rows' moments (Chan et al. parallel variance)
+    mean = np.dot(row_count, row_mean) / count
+    m2 = row_m2.sum() + np.dot(row_count, (row_mean - mean) ** 2)
+    return row_min.min(), row_max.max(), mean, np.sqrt(m2 / count)
+
 
 class PhysicsValidator:
     """Validate physical consistency of predictions"""
@@ -32,7 +370,8 @@ class PhysicsValidator:
     def calculate_ndbi(
         self,
         red_band: np.ndarray,
-        nir_band: np.ndarray
+        nir_band: np.ndarray,
+        out: Optional[np.ndarray] = None
     ) -> np.ndarray:
         """
         Calculate Normalized Difference Built-up Index (NDBI)
@@ -45,15 +384,48 @@ class PhysicsValidator:
         Args:
             red_band: Red band (B4) or SWIR approximation
             nir_band: Near-infrared band (B8)
+            out: Optional output array to fill
             
         Returns:
             NDBI array (range: -1 to 1)
         """
         # Simplified NDBI calculation
         # In production, would use actual SWIR band
-        ndbi = (red_band - nir_band) / (red_band + nir_band + 1e-10)
-        ndbi = np.clip(ndbi, -1, 1)
-        return ndbi
+        dtype = np.result_type(_float_dtype(red_band.dtype), _float_dtype(nir_band.dtype))
+        if (
+            NUMBA_AVAILABLE
+            and red_band.shape == nir_band.shape
+            and red_band.dtype == nir_band.dtype
+            # float32/float64, or 8/16-bit integers (exact in the kernel's
+            # float math); numba has no float16
+            and (red_band.dtype in (np.float32, np.float64) or (
+                red_band.dtype.kind in 'iu' and red_band.dtype.itemsize <= 2
+            ))
+            and (out is None or (
+                out.shape == red_band.shape
+                and out.dtype == dtype
+                and out.flags.c_contiguous
+            ))
+        ):
+            # Fused single pass; the epsilon is cast to the output precision
+            ndbi = np.empty(red_band.shape, dtype=dtype) if out is None else out
+            _ndbi_kernel(
+                red_band.ravel(), nir_band.ravel(), dtype.type(1e-10), ndbi.ravel()
+            )
+            return ndbi
+        
+        # Two buffers, filled in place. Integer bands (e.g. uint16 DN) are
+        # combined in float32 rather than upcast to float64, and the float
+        # loops keep the difference and sum from wrapping around
+        if out is None:
+            out = np.empty(np.broadcast_shapes(red_band.shape, nir_band.shape), dtype=dtype)
+        denominator = np.empty_like(out)
+        np.subtract(red_band, nir_band, out=out, dtype=dtype)
+        np.add(red_band, nir_band, out=denominator, dtype=dtype)
+        np.add(denominator, 1e-10, out=denominator)
+        np.divide(out, denominator, out=out)
+        np.clip(out, -1, 1, out=out)
+        return out
     
     def validate_uhi_ndvi_correlation(
         self,
@@ -77,15 +449,10 @@ class PhysicsValidator:
         if not SCIPY_AVAILABLE:
             raise ImportError("scipy is required for correlation analysis")
         
-        # Flatten arrays and remove NaN
-        uhi_flat = uhi_intensity.flatten()
-        ndvi_flat = ndvi.flatten()
-        
-        valid_mask = ~(np.isnan(uhi_flat) | np.isnan(ndvi_flat))
-        uhi_valid = uhi_flat[valid_mask]
-        ndvi_valid = ndvi_flat[valid_mask]
+        # Pearson correlation over pixels valid in both arrays
+        correlation, p_value, n_valid = _pearson(uhi_intensity, ndvi)
         
-        if len(uhi_valid) < 10:
+        if n_valid < 10:
             return {
                 'correlation': np.nan,
                 'p_value': np.nan,
@@ -93,9 +460,6 @@ class PhysicsValidator:
                 'message': 'Insufficient data for correlation'
             }
         
-        # Calculate Pearson correlation
-        correlation, p_value = stats.pearsonr(uhi_valid, ndvi_valid)
-        
         # Validate: correlation should be negative
         is_valid = correlation < 0 and p_value < 0.05
         
@@ -136,15 +500,10 @@ class PhysicsValidator:
         if not SCIPY_AVAILABLE:
             raise ImportError("scipy is required for correlation analysis")
         
-        # Flatten arrays and remove NaN
-        uhi_flat = uhi_intensity.flatten()
-        ndbi_flat = ndbi.flatten()
+        # Pearson correlation over pixels valid in both arrays
+        correlation, p_value, n_valid = _pearson(uhi_intensity, ndbi)
         
-        valid_mask = ~(np.isnan(uhi_flat) | np.isnan(ndbi_flat))
-        uhi_valid = uhi_flat[valid_mask]
-        ndbi_valid = ndbi_flat[valid_mask]
-        
-        if len(uhi_valid) < 10:
+        if n_valid < 10:
             return {
                 'correlation': np.nan,
                 'p_value': np.nan,
@@ -152,9 +511,6 @@ class PhysicsValidator:
                 'message': 'Insufficient data for correlation'
             }
         
-        # Calculate Pearson correlation
-        correlation, p_value = stats.pearsonr(uhi_valid, ndbi_valid)
-        
         # Validate: correlation should be positive
         is_valid = correlation > 0 and p_value < 0.05
         
@@ -193,10 +549,7 @@ class PhysicsValidator:
             Validation results dictionary
         """
         # Simplified validation: check temperature range
-        temp_min = np.nanmin(temperature)
-        temp_max = np.nanmax(temperature)
-        temp_mean = np.nanmean(temperature)
-        temp_std = np.nanstd(temperature)
+        temp_min, temp_max, temp_mean, temp_std = _temperature_statistics(temperature)
         
         # Reasonable temperature range for urban areas (Europe)
         min_reasonable = -20  # °C
@@ -246,13 +599,8 @@ class PhysicsValidator:
                 'message': 'Spatial coherence requires 2D array'
             }
         
-        # Calculate gradients
-        grad_y, grad_x = np.gradient(temperature)
-        grad_magnitude = np.sqrt(grad_x**2 + grad_y**2)
-        
         # Check for excessive gradients
-        max_gradient = np.nanmax(grad_magnitude)
-        mean_gradient = np.nanmean(grad_magnitude)
+        max_gradient, mean_gradient = _gradient_magnitude_statistics(temperature)
         
         # Convert gradient (per pixel) to temperature difference
         # Assuming 100m resolution, gradient of 1 K/pixel ≈ 10 K/km
@@ -280,7 +628,7 @@ class PhysicsValidator:
         temperature: np.ndarray,
         ndvi: np.ndarray,
         ndbi: Optional[np.ndarray] = None,
-        reference_temp: float = 20.0
+        reference_temp: Optional[float] = None
     ) -> Dict:
         """
         Perform comprehensive physics validation
@@ -288,25 +636,35 @@ class PhysicsValidator:
         Args:
             temperature: Predicted temperature array
             ndvi: NDVI array
-            ndbi: Optional NDBI array (will be calculated if not provided)
-            reference_temp: Reference temperature for UHI calculation
+            ndbi: Optional NDBI array (the UHI-NDBI check is skipped if not provided)
+            reference_temp: Deprecated and ignored. UHI intensity is
+                temperature - reference, and the correlations do not change
+                under a constant offset
             
         Returns:
             Comprehensive validation results
         """
         logger.info("Performing comprehensive physics validation...")
         
+        if reference_temp is not None:
+            warnings.warn(
+                "reference_temp is ignored: UHI correlations do not depend on the reference",
+                DeprecationWarning,
+                stacklevel=2
+            )
+        
         results = {}
         
-        # Calculate UHI intensity
-        uhi_intensity = temperature - reference_temp
+        # UHI intensity is temperature - reference. Correlations do not
+        # change under a constant offset, so the temperature is passed as is
+        # instead of materializing the shifted array.
         
         # Validate UHI-NDVI correlation
-        results['uhi_ndvi'] = self.validate_uhi_ndvi_correlation(uhi_intensity, ndvi)
+        results['uhi_ndvi'] = self.validate_uhi_ndvi_correlation(temperature, ndvi)
         
         # Validate UHI-NDBI correlation (if NDBI provided or can be calculated)
         if ndbi is not None:
-            results['uhi_ndbi'] = self.validate_uhi_ndbi_correlation(uhi_intensity, ndbi)
+            results['uhi_ndbi'] = self.validate_uhi_ndbi_correlation(temperature, ndbi)
         else:
             results['uhi_ndbi'] = {
                 'is_valid': None,
@@ -7,22 +7,38 @@ Phase 1: Simple passthrough with metadata extraction.
 
 import json
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import rasterio
+from rasterio.transform import array_bounds
 from rasterio.warp import calculate_default_transform, reproject, Resampling
 
+from src.ingest import RasterHandle, memory_raster
 from src.models import Manifest, RasterMetadata, Bounds
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# GDAL warper threads and working memory (MB) for reprojection
+WARP_THREADS = os.cpu_count() or 1
+WARP_MEM_LIMIT = 512
+
 
 def preprocess_raster(
     input_path: Path,
     output_path: Path,
     target_crs: str = "EPSG:3857",
-    resampling: Resampling = Resampling.bilinear
+    resampling: Resampling = Resampling.bilinear,
+    source: Optional[RasterHandle] = None,
+    num_threads: int = WARP_THREADS
 ) -> RasterMetadata:
     """
     Reproject and resample a raster
@@ -32,10 +48,94 @@ def preprocess_raster(
         output_path: Destination raster
         target_crs: Target coordinate system
         resampling: Resampling method
+        source: In-memory pixels of input_path; when given, the source
+            GeoTIFF is not read
+        num_threads: GDAL warper threads
         
     Returns:
         Metadata of output raster
     """
+    if source is not None:
+        metadata = _reproject_array(source, output_path, target_crs, resampling, num_threads)
+    else:
+        metadata = _reproject_file(input_path, output_path, target_crs, resampling, num_threads)
+    
+    logger.info(f"✅ Preprocessed: {input_path.name} -> {output_path.name}")
+    return metadata
+
+
+def _raster_metadata(dst) -> RasterMetadata:
+    """Metadata of an open raster dataset"""
+    bounds = dst.bounds
+    return RasterMetadata(
+        crs=str(dst.crs),
+        transform=list(dst.transform)[:6],
+        width=dst.width,
+        height=dst.height,
+        nodata=dst.nodata,
+        dtype=str(dst.dtypes[0]),
+        bounds=Bounds(
+            minx=bounds.left,
+            miny=bounds.bottom,
+            maxx=bounds.right,
+            maxy=bounds.top
+        ),
+        band_count=dst.count
+    )
+
+
+def _reproject_array(
+    source: RasterHandle,
+    output_path: Path,
+    target_crs: str,
+    resampling: Resampling,
+    num_threads: int
+) -> RasterMetadata:
+    """Reproject an in-memory single-band raster to a GeoTIFF"""
+    height, width = source.data.shape
+    transform, dst_width, dst_height = calculate_default_transform(
+        source.crs, target_crs, width, height,
+        *array_bounds(height, width, source.transform)
+    )
+    
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with rasterio.open(
+        output_path,
+        'w',
+        driver='GTiff',
+        height=dst_height,
+        width=dst_width,
+        count=1,
+        dtype=source.data.dtype,
+        nodata=source.nodata,
+        crs=target_crs,
+        transform=transform,
+        compress='lzw',
+        tiled=True
+    ) as dst:
+        reproject(
+            source=source.data,
+            destination=rasterio.band(dst, 1),
+            src_transform=source.transform,
+            src_crs=source.crs,
+            src_nodata=source.nodata,
+            dst_transform=transform,
+            dst_crs=target_crs,
+            resampling=resampling,
+            num_threads=num_threads,
+            warp_mem_limit=WARP_MEM_LIMIT
+        )
+        return _raster_metadata(dst)
+
+
+def _reproject_file(
+    input_path: Path,
+    output_path: Path,
+    target_crs: str,
+    resampling: Resampling,
+    num_threads: int
+) -> RasterMetadata:
+    """Reproject all bands of a raster file to a GeoTIFF in one warp"""
     with rasterio.open(input_path) as src:
         # Calculate transform for target CRS
         transform, width, height = calculate_default_transform(
@@ -55,39 +155,60 @@ def preprocess_raster(
         
         # Reproject
         output_path.parent.mkdir(parents=True, exist_ok=True)
+        bands = list(range(1, src.count + 1))
         with rasterio.open(output_path, 'w', **kwargs) as dst:
-            for i in range(1, src.count + 1):
-                reproject(
-                    source=rasterio.band(src, i),
-                    destination=rasterio.band(dst, i),
-                    src_transform=src.transform,
-                    src_crs=src.crs,
-                    dst_transform=transform,
-                    dst_crs=target_crs,
-                    resampling=resampling
-                )
-        
-        # Extract metadata
-        with rasterio.open(output_path) as dst:
-            bounds = dst.bounds
-            metadata = RasterMetadata(
-                crs=str(dst.crs),
-                transform=list(dst.transform)[:6],
-                width=dst.width,
-                height=dst.height,
-                nodata=dst.nodata,
-                dtype=str(dst.dtypes[0]),
-                bounds=Bounds(
-                    minx=bounds.left,
-                    miny=bounds.bottom,
-                    maxx=bounds.right,
-                    maxy=bounds.top
-                ),
-                band_count=dst.count
+            reproject(
+                source=rasterio.band(src, bands),
+                destination=rasterio.band(dst, bands),
+                src_transform=src.transform,
+                src_crs=src.crs,
+                dst_transform=transform,
+                dst_crs=target_crs,
+                resampling=resampling,
+                num_threads=num_threads,
+                warp_mem_limit=WARP_MEM_LIMIT
             )
+            return _raster_metadata(dst)
+
+
+def _preprocess_one(
+    variable: str,
+    raw_dir: Path,
+    intermediate_dir: Path,
+    target_crs: str,
+    num_threads: int
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Reproject one variable's raw raster
     
-    logger.info(f"✅ Preprocessed: {input_path.name} -> {output_path.name}")
-    return metadata
+    Args:
+        variable: Variable name
+        raw_dir: Directory of the ingested rasters
+        intermediate_dir: Output directory
+        target_crs: Target coordinate system
+        num_threads: GDAL warper threads
+        
+    Returns:
+        (variable, metadata as JSON dict), metadata None if the input is missing
+    """
+    input_path = raw_dir / f"{variable}_mock.tif"
+    output_path = intermediate_dir / f"{variable}_reprojected.tif"
+    
+    # Rasters generated earlier in this process are reprojected from memory
+    # (taking them releases the in-memory copy)
+    source = memory_raster(input_path)
+    if source is None and not input_path.exists():
+        logger.warning(f"⚠️  Input file not found: {input_path}")
+        return variable, None
+    
+    metadata = preprocess_raster(
+        input_path=input_path,
+        output_path=output_path,
+        target_crs=target_crs,
+        source=source,
+        num_threads=num_threads
+    )
+    return variable, metadata.to_json()
 
 
 def preprocess_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
@@ -106,40 +227,48 @@ def preprocess_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     if not manifest.paths or not manifest.paths.raw:
         raise ValueError("No raw data path in manifest")
     
-    raw_dir = Path(manifest.paths.raw.replace("gs://", "/tmp/gcs/"))
-    intermediate_dir = Path(manifest.paths.intermediate.replace("gs://", "/tmp/gcs/"))
+    raw_dir = manifest.paths.local_raw
+    intermediate_dir = manifest.paths.local_intermediate
     intermediate_dir.mkdir(parents=True, exist_ok=True)
     
     target_crs = manifest.grid.crs
-    metadata_dict = {}
     
-    # Process each variable
-    for variable in manifest.variables:
-        input_path = raw_dir / f"{variable}_mock.tif"
-        output_path = intermediate_dir / f"{variable}_reprojected.tif"
-        
-        if input_path.exists():
-            metadata = preprocess_raster(
-                input_path=input_path,
-                output_path=output_path,
-                target_crs=target_crs
-            )
-            metadata_dict[variable] = metadata.to_json()
-        else:
-            logger.warning(f"⚠️  Input file not found: {input_path}")
+    # Warp the variables concurrently (GDAL releases the GIL while warping)
+    # and split the warper threads between them. Results keep the
+    # manifest's variable order.
+    variables = list(manifest.variables)
+    n_workers = max(1, min(len(variables), WARP_THREADS))
+    num_threads = max(1, WARP_THREADS // n_workers)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        results = executor.map(
+            lambda variable: _preprocess_one(
+                variable, raw_dir, intermediate_dir, target_crs, num_threads
+            ),
+            variables
+        )
+        metadata_dict = {
+            variable: metadata
+            for variable, metadata in results
+            if metadata is not None
+        }
     
     # Update manifest
     manifest.stage = "preprocess"
     
     # Save metadata
     metadata_path = intermediate_dir / "raster_metadata.json"
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata_dict, f, indent=2)
+    if ORJSON_AVAILABLE:
+        metadata_path.write_bytes(
+            orjson.dumps(metadata_dict, option=orjson.OPT_INDENT_2)
+        )
+    else:
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata_dict, f, indent=2)
     
     # Save updated manifest
     manifest_path = intermediate_dir / "manifest.json"
     with open(manifest_path, 'w') as f:
-        json.dump(manifest.to_json(), f, indent=2)
+        f.write(manifest.model_dump_json(indent=2))
     
     logger.info(f"✅ Preprocess complete: {len(metadata_dict)} rasters")
     logger.info(f"   Output: {intermediate_dir}")
@@ -10,11 +10,18 @@ Reference: https://huggingface.co/ibm-granite/granite-geospatial-wxc
 
 import logging
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import json
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+try:
+    import rasterio
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+
 try:
     from transformers import AutoModel, AutoProcessor
     from PIL import Image
@@ -22,7 +29,7 @@ try:
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
-    logger.warning("transformers or torch not available. Install with: pip install transformers torch pillow")
+    logger.warning("transformers or torch not available. Install with: pip install transformers accelerate torch pillow")
 
 
 class PrithviWxCSetup:
@@ -46,7 +53,7 @@ class PrithviWxCSetup:
         if not TRANSFORMERS_AVAILABLE:
             raise ImportError(
                 "transformers and torch are required. "
-                "Install with: pip install transformers torch pillow"
+                "Install with: pip install transformers accelerate torch pillow"
             )
         
         self.cache_dir = Path(cache_dir) if cache_dir else self.DEFAULT_CACHE_DIR
@@ -60,9 +67,68 @@ class PrithviWxCSetup:
         
         self.model = None
         self.processor = None
+        self._model_stats = None
         
         logger.info(f"Prithvi WxC initialized (device: {self.device}, cache: {self.cache_dir})")
     
+    def _compute_dtype(self) -> "torch.dtype":
+        """Weight and autocast dtype for the device"""
+        if self.device.startswith("cuda"):
+            return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        return torch.float32
+    
+    def _prepare_model(self):
+        """
+        Switch the loaded model to inference
+        
+        On GPU the model is wrapped with torch.compile (reduce-overhead mode,
+        i.e. CUDA graphs); compilation happens on the first forward pass.
+        """
+        self._model_stats = None
+        self.model.eval()
+        if self.device.startswith("cuda"):
+            self.model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False)
+    
+    def _model_statistics(self) -> Dict[str, int]:
+        """
+        Parameter counts and size of the loaded model
+        
+        Computed in a single pass over the parameters and cached until the
+        model is reloaded.
+        """
+        if self._model_stats is None:
+            num_params = 0
+            trainable_params = 0
+            size_bytes = 0
+            for p in self.model.parameters():
+                n = p.numel()
+                num_params += n
+                size_bytes += n * p.element_size()
+                if p.requires_grad:
+                    trainable_params += n
+            self._model_stats = {
+                "num_parameters": num_params,
+                "trainable_parameters": trainable_params,
+                "size_bytes": size_bytes
+            }
+        return self._model_stats
+    
+    def _model_load_kwargs(self) -> Dict[str, Any]:
+        """
+        from_pretrained arguments that load the weights straight onto the device
+        
+        Weights are created on the target device in their target dtype (bf16
+        on GPUs that support it, fp16 on older GPUs, fp32 on CPU) instead of
+        being materialized on the host first. Safetensors checkpoints are
+        preferred by from_pretrained when the repository provides them.
+        """
+        return {
+            "cache_dir": str(self.cache_dir),
+            "torch_dtype": self._compute_dtype(),
+            "low_cpu_mem_usage": True,
+            "device_map": self.device
+        }
+    
     def download_model(self, force_download: bool = False) -> Dict[str, Any]:
         """
         Download Prithvi WxC model weights from Hugging Face
@@ -89,26 +155,21 @@ class PrithviWxCSetup:
             logger.info("Downloading model weights (this may take a while)...")
             self.model = AutoModel.from_pretrained(
                 self.MODEL_NAME,
-                cache_dir=str(self.cache_dir),
                 force_download=force_download,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
+                **self._model_load_kwargs()
             )
-            
-            # Move to device
-            self.model = self.model.to(self.device)
-            self.model.eval()
+            self._prepare_model()
             
             logger.info(f"✅ Model downloaded and loaded on {self.device}")
             
             # Get model info
-            num_params = sum(p.numel() for p in self.model.parameters())
-            model_size_mb = sum(p.numel() * p.element_size() for p in self.model.parameters()) / (1024 * 1024)
+            stats = self._model_statistics()
             
             return {
                 "model_name": self.MODEL_NAME,
                 "device": self.device,
-                "num_parameters": num_params,
-                "model_size_mb": model_size_mb,
+                "num_parameters": stats["num_parameters"],
+                "model_size_mb": stats["size_bytes"] / (1024 * 1024),
                 "cache_dir": str(self.cache_dir)
             }
             
@@ -133,12 +194,9 @@ class PrithviWxCSetup:
             
             self.model = AutoModel.from_pretrained(
                 self.MODEL_NAME,
-                cache_dir=str(self.cache_dir),
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
+                **self._model_load_kwargs()
             )
-            
-            self.model = self.model.to(self.device)
-            self.model.eval()
+            self._prepare_model()
             
             logger.info(f"✅ Model loaded from cache on {self.device}")
             return True
@@ -147,6 +205,67 @@ class PrithviWxCSetup:
             logger.warning(f"Failed to load from cache: {e}")
             return False
     
+    @staticmethod
+    def _load_image(image_path: Path):
+        """
+        Load an inference input
+        
+        GeoTIFFs are read with rasterio straight into a float32 array (HWC,
+        or HW for one band), keeping every band; other formats (and GeoTIFFs
+        when rasterio is missing) go through PIL.
+        
+        Args:
+            image_path: Path to input image
+            
+        Returns:
+            (image for the processor, (width, height))
+        """
+        if RASTERIO_AVAILABLE and Path(image_path).suffix.lower() in (".tif", ".tiff"):
+            with rasterio.open(image_path) as src:
+                data = src.read(out_dtype="float32")
+            image = data[0] if data.shape[0] == 1 else data.transpose(1, 2, 0)
+            return image, (data.shape[2], data.shape[1])
+        
+        with Image.open(image_path) as image:
+            image.load()
+            return image, image.size
+    
+    def _forward(self, inputs: Dict[str, Any]) -> "torch.Tensor":
+        """
+        Run the model on processor outputs
+        
+        Args:
+            inputs: Processor outputs (batched tensors)
+            
+        Returns:
+            Model predictions (logits, last hidden state or raw output)
+        """
+        # Pinned host buffers let the host-to-device copy run asynchronously;
+        # it is ordered before the forward pass on the same stream
+        if self.device.startswith("cuda"):
+            inputs = {
+                k: v.pin_memory().to(self.device, non_blocking=True)
+                for k, v in inputs.items()
+            }
+        else:
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        
+        # Run inference (mixed precision on GPU, matching the weights)
+        device_type = torch.device(self.device).type
+        with torch.inference_mode(), torch.autocast(
+            device_type=device_type,
+            dtype=self._compute_dtype(),
+            enabled=device_type == "cuda"
+        ):
+            outputs = self.model(**inputs)
+        
+        # Extract results
+        if hasattr(outputs, 'logits'):
+            return outputs.logits
+        if hasattr(outputs, 'last_hidden_state'):
+            return outputs.last_hidden_state
+        return outputs[0] if isinstance(outputs, tuple) else outputs
+    
     def simple_inference(
         self,
         image_path: Path,
@@ -171,26 +290,14 @@ class PrithviWxCSetup:
         
         try:
             # Load image
-            image = Image.open(image_path)
+            image, size = self._load_image(image_path)
             
-            # Process image
+            # Process image and run inference
             inputs = self.processor(images=image, return_tensors="pt")
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            # Run inference
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-            
-            # Extract results
-            if hasattr(outputs, 'logits'):
-                predictions = outputs.logits
-            elif hasattr(outputs, 'last_hidden_state'):
-                predictions = outputs.last_hidden_state
-            else:
-                predictions = outputs[0] if isinstance(outputs, tuple) else outputs
+            predictions = self._forward(inputs)
             
             result = {
-                "input_shape": image.size,
+                "input_shape": size,
                 "output_shape": list(predictions.shape),
                 "task": task,
                 "device": self.device
@@ -199,9 +306,9 @@ class PrithviWxCSetup:
             # Save output if path provided
             if output_path:
                 # Convert to numpy and save (simplified - actual implementation depends on output format)
-                import numpy as np
                 if isinstance(predictions, torch.Tensor):
-                    predictions_np = predictions.cpu().numpy()
+                    # NumPy has no bfloat16: widen half-precision outputs
+                    predictions_np = predictions.float().cpu().numpy()
                     np.save(output_path, predictions_np)
                     result["output_saved"] = str(output_path)
             
@@ -212,19 +319,77 @@ class PrithviWxCSetup:
             logger.error(f"Inference failed: {e}")
             raise
     
+    def simple_inference_batch(
+        self,
+        image_paths: List[Path],
+        task: str = "downscaling",
+        output_dir: Optional[Path] = None,
+        batch_size: int = 8
+    ) -> List[Dict[str, Any]]:
+        """
+        Run inference on several images, one forward pass per batch
+        
+        Args:
+            image_paths: Paths to input images (same size within a batch)
+            task: Task type (e.g., "downscaling", "super_resolution")
+            output_dir: Optional directory to save one <stem>.npy per image
+            batch_size: Images per forward pass
+            
+        Returns:
+            One result dictionary per image, as from simple_inference
+        """
+        if self.model is None or self.processor is None:
+            raise ValueError("Model not loaded. Call download_model() or load_model() first.")
+        
+        logger.info(f"Running batched inference on {len(image_paths)} images (task: {task})")
+        
+        if output_dir:
+            output_dir = Path(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+        
+        results = []
+        try:
+            for start in range(0, len(image_paths), batch_size):
+                batch_paths = image_paths[start:start + batch_size]
+                images, sizes = zip(*[self._load_image(path) for path in batch_paths])
+                inputs = self.processor(images=list(images), return_tensors="pt")
+                
+                predictions = self._forward(inputs)
+                # NumPy has no bfloat16: widen half-precision outputs
+                predictions_np = predictions.float().cpu().numpy() if output_dir else None
+                
+                for i, (path, size) in enumerate(zip(batch_paths, sizes)):
+                    result = {
+                        "input_shape": size,
+                        "output_shape": list(predictions[i:i + 1].shape),
+                        "task": task,
+                        "device": self.device
+                    }
+                    if output_dir:
+                        output_path = output_dir / f"{Path(path).stem}.npy"
+                        np.save(output_path, predictions_np[i:i + 1])
+                        result["output_saved"] = str(output_path)
+                    results.append(result)
+            
+            logger.info(f"✅ Batched inference completed: {len(results)} images")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Batched inference failed: {e}")
+            raise
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the loaded model"""
         if self.model is None:
             return {"status": "not_loaded"}
         
-        num_params = sum(p.numel() for p in self.model.parameters())
-        trainable_params = sum(p.numel() for p in self.model.parameters() if p.requires_grad)
+        stats = self._model_statistics()
         
         return {
             "model_name": self.MODEL_NAME,
             "device": self.device,
-            "num_parameters": num_params,
-            "trainable_parameters": trainable_params,
+            "num_parameters": stats["num_parameters"],
+            "trainable_parameters": stats["trainable_parameters"],
             "model_loaded": True,
             "processor_loaded": self.processor is not None
         }
@@ -238,7 +403,7 @@ def test_prithvi_setup():
     
     if not TRANSFORMERS_AVAILABLE:
         print("⚠️  transformers/torch not available. Skipping test.")
-        print("   Install with: pip install transformers torch pillow")
+        print("   Install with: pip install transformers accelerate torch pillow")
         return False
     
     try:
@@ -5,7 +5,9 @@ Generates final products (complete time series) for the hackathon period.
 Exports downscaled temperature data, NDVI maps, and UHI indicators.
 """
 
+import importlib
 import logging
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
@@ -15,11 +17,116 @@ logger = logging.getLogger(__name__)
 
 try:
     import numpy as np
-    import xarray as xr
     NUMPY_AVAILABLE = True
 except ImportError:
     NUMPY_AVAILABLE = False
-    logger.warning("numpy/xarray not available. Install with: pip install numpy xarray")
+    logger.warning("numpy not available. Install with: pip install numpy xarray")
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(parallel=True, cache=True)
+    def _uhi_row_statistics(
+        data, reference, row_min, row_max, row_count, row_mean, row_m2, row_warm, row_hot
+    ):
+        """
+        Per-row moments and threshold counts of data - reference, ignoring NaN
+        
+        The centered pass re-reads a row while it is still in cache, so the
+        raster is streamed from memory once.
+        """
+        for r in numba.prange(data.shape[0]):
+            r_min = np.inf
+            r_max = -np.inf
+            r_sum = 0.0
+            r_count = 0
+            r_warm = 0
+            r_hot = 0
+            for c in range(data.shape[1]):
+                value = data[r, c] - reference
+                if np.isnan(value):
+                    continue
+                r_min = min(r_min, value)
+                r_max = max(r_max, value)
+                r_sum += value
+                r_count += 1
+                if value > 2.0:
+                    r_warm += 1
+                if value > 4.0:
+                    r_hot += 1
+            r_mean = r_sum / r_count if r_count > 0 else 0.0
+            r_m2 = 0.0
+            for c in range(data.shape[1]):
+                value = data[r, c] - reference
+                if np.isnan(value):
+                    continue
+                r_m2 += (value - r_mean) * (value - r_mean)
+            row_min[r] = r_min
+            row_max[r] = r_max
+            row_count[r] = r_count
+            row_mean[r] = r_mean
+            row_m2[r] = r_m2
+            row_warm[r] = r_warm
+            row_hot[r] = r_hot
+
+
+@lru_cache(maxsize=None)
+def _lazy_import(name: str):
+    """
+    Import a module on first use
+    
+    xarray and the NetCDF writers (h5netcdf, hdf5plugin, dask) are only
+    needed for the time series, so they are not imported with the module.
+    
+    Args:
+        name: Module name
+        
+    Returns:
+        The module, None when it is not installed
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def _write_json(path: Path, obj: Dict):
+    """Write a JSON document with 2-space indentation (orjson when available)"""
+    if ORJSON_AVAILABLE:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2)
+
+
+def _empty_aligned(shape: Tuple[int, ...], dtype, alignment: int = 4096) -> np.ndarray:
+    """
+    Uninitialized array whose buffer starts on a page boundary
+    
+    Args:
+        shape: Array shape
+        dtype: Array dtype
+        alignment: Buffer alignment in bytes
+        
+    Returns:
+        Array viewing an aligned slice of a slightly larger byte buffer
+    """
+    dtype = np.dtype(dtype)
+    size = int(np.prod(shape)) * dtype.itemsize
+    raw = np.empty(size + alignment - 1, dtype=np.uint8)
+    offset = -raw.ctypes.data % alignment
+    return raw[offset:offset + size].view(dtype).reshape(shape)
 
 
 class ProductGenerator:
@@ -29,7 +136,8 @@ class ProductGenerator:
         self,
         output_dir: Path,
         start_date: datetime,
-        end_date: datetime
+        end_date: datetime,
+        output_formats: Optional[List[str]] = None
     ):
         """
         Initialize product generator
@@ -38,11 +146,14 @@ class ProductGenerator:
             output_dir: Directory to save generated products
             start_date: Start date for time series
             end_date: End date for time series
+            output_formats: Extra output formats (config output.formats);
+                "zarr" adds a Zarr store next to the NetCDF time series
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.start_date = start_date
         self.end_date = end_date
+        self.output_formats = list(output_formats or [])
         
         logger.info(f"Product Generator initialized: {start_date} to {end_date}")
     
@@ -61,8 +172,12 @@ class ProductGenerator:
         Returns:
             Path to generated NetCDF file
         """
-        if not NUMPY_AVAILABLE:
+        xr = _lazy_import("xarray")
+        if not NUMPY_AVAILABLE or xr is None:
             raise ImportError("numpy and xarray are required for time series generation")
+        hdf5plugin = _lazy_import("hdf5plugin")
+        use_blosc = hdf5plugin is not None and _lazy_import("h5netcdf") is not None
+        dsa = _lazy_import("dask.array")
         
         logger.info("Generating time series NetCDF...")
         
@@ -80,9 +195,24 @@ class ProductGenerator:
         n_time = len(predictions)
         n_lat, n_lon = first_pred.shape
         
-        data_array = np.zeros((n_time, n_lat, n_lon))
-        for i, date_str in enumerate(sorted(predictions.keys())):
-            data_array[i] = predictions[date_str]
+        # One day per chunk, tiled horizontally: matches the day-by-day
+        # writes and the single-map reads of viewers
+        chunk_shape = (1, min(n_lat, 256), min(n_lon, 256))
+        
+        sorted_keys = sorted(predictions.keys())
+        if dsa is not None:
+            # Lazy stack: days are converted and written chunk by chunk, so
+            # the (time, lat, lon) array is never held in memory
+            data_array = dsa.stack([
+                dsa.from_array(predictions[date_str], chunks=chunk_shape[1:]).astype(np.float32)
+                for date_str in sorted_keys
+            ])
+        else:
+            # Single copy straight into a page-aligned float32 buffer
+            data_array = np.stack(
+                [predictions[date_str] for date_str in sorted_keys],
+                out=_empty_aligned((n_time, n_lat, n_lon), np.float32)
+            )
         
         # Create xarray Dataset
         ds = xr.Dataset(
@@ -114,9 +244,59 @@ class ProductGenerator:
         
         # Save to NetCDF
         output_path = self.output_dir / 'temperature_timeseries.nc'
-        ds.to_netcdf(output_path, format='NETCDF4')
+        encoding = {'temperature': {'chunksizes': chunk_shape}}
+        if use_blosc:
+            # Multithreaded Blosc-Zstd with byte shuffle
+            encoding['temperature'].update(
+                hdf5plugin.Blosc(cname='zstd', clevel=5, shuffle=hdf5plugin.Blosc.SHUFFLE)
+            )
+            ds.to_netcdf(output_path, engine='h5netcdf', encoding=encoding, unlimited_dims=[])
+        else:
+            ds.to_netcdf(output_path, format='NETCDF4', encoding=encoding, unlimited_dims=[])
         
         logger.info(f"✅ Time series saved to {output_path}")
+        
+        if "zarr" in self.output_formats:
+            self._write_zarr(ds, chunk_shape)
+        
+        return output_path
+    
+    def _write_zarr(self, ds: "xr.Dataset", chunk_shape: Tuple[int, int, int]) -> Optional[Path]:
+        """
+        Write the time series as a Zarr store (Blosc-Zstd, same chunks)
+        
+        Chunks are independent files, so dask-backed data is written in
+        parallel without the HDF5 lock.
+        
+        Args:
+            ds: Time series dataset
+            chunk_shape: (time, lat, lon) chunk shape
+            
+        Returns:
+            Path to the store, None when zarr is not installed
+        """
+        zarr = _lazy_import("zarr")
+        if zarr is None:
+            logger.warning("⚠️  zarr not installed, skipping Zarr output. Install with: pip install zarr")
+            return None
+        
+        if int(zarr.__version__.split('.')[0]) >= 3:
+            compression = {
+                'compressors': (zarr.codecs.BloscCodec(cname='zstd', clevel=3, shuffle='shuffle'),)
+            }
+        else:
+            compression = {
+                'compressor': zarr.Blosc(cname='zstd', clevel=3, shuffle=zarr.Blosc.SHUFFLE)
+            }
+        
+        output_path = self.output_dir / 'temperature_timeseries.zarr'
+        ds.to_zarr(
+            output_path,
+            mode='w',
+            encoding={'temperature': {'chunks': chunk_shape, **compression}}
+        )
+        
+        logger.info(f"✅ Zarr time series saved to {output_path}")
         return output_path
     
     def generate_uhi_indicators(
@@ -138,20 +318,74 @@ class ProductGenerator:
         """
         logger.info("Calculating UHI indicators...")
         
-        uhi_intensity = temperature_data - reference_temperature
+        if NUMBA_AVAILABLE and temperature_data.size > 0:
+            indicators = self._fused_uhi_indicators(temperature_data, reference_temperature)
+            if indicators is not None:
+                logger.info(f"Mean UHI intensity: {indicators['mean_uhi']:.2f}°C")
+                return indicators
+        
+        # Python float scalar: float32 input stays float32
+        uhi_intensity = temperature_data - float(reference_temperature)
         
         indicators = {
             'mean_uhi': float(np.nanmean(uhi_intensity)),
             'max_uhi': float(np.nanmax(uhi_intensity)),
             'min_uhi': float(np.nanmin(uhi_intensity)),
             'std_uhi': float(np.nanstd(uhi_intensity)),
-            'uhi_area_km2': float(np.sum(uhi_intensity > 2.0) * 0.01),  # Assuming 100m resolution
-            'hotspot_count': int(np.sum(uhi_intensity > 4.0))
+            'uhi_area_km2': float(np.count_nonzero(uhi_intensity > 2.0) * 0.01),  # Assuming 100m resolution
+            'hotspot_count': int(np.count_nonzero(uhi_intensity > 4.0))
         }
         
         logger.info(f"Mean UHI intensity: {indicators['mean_uhi']:.2f}°C")
         return indicators
     
+    @staticmethod
+    def _fused_uhi_indicators(
+        temperature_data: np.ndarray,
+        reference_temperature: float
+    ) -> Optional[Dict]:
+        """
+        UHI indicators in one pass, without the intensity array
+        
+        Args:
+            temperature_data: Temperature array
+            reference_temperature: Reference temperature (rural baseline)
+            
+        Returns:
+            Dictionary with UHI indicators, None when no pixel is valid
+        """
+        data = temperature_data.reshape(
+            temperature_data.shape[0] if temperature_data.ndim > 1 else 1, -1
+        )
+        n_rows = data.shape[0]
+        row_min = np.empty(n_rows)
+        row_max = np.empty(n_rows)
+        row_count = np.empty(n_rows, dtype=np.int64)
+        row_mean = np.empty(n_rows)
+        row_m2 = np.empty(n_rows)
+        row_warm = np.empty(n_rows, dtype=np.int64)
+        row_hot = np.empty(n_rows, dtype=np.int64)
+        _uhi_row_statistics(
+            data, float(reference_temperature),
+            row_min, row_max, row_count, row_mean, row_m2, row_warm, row_hot
+        )
+        
+        count = row_count.sum()
+        if count == 0:
+            return None
+        
+        # Combine the rows' moments (Chan et al. parallel variance)
+        mean = np.dot(row_count, row_mean) / count
+        m2 = row_m2.sum() + np.dot(row_count, (row_mean - mean) ** 2)
+        return {
+            'mean_uhi': float(mean),
+            'max_uhi': float(row_max.max()),
+            'min_uhi': float(row_min.min()),
+            'std_uhi': float(np.sqrt(m2 / count)),
+            'uhi_area_km2': float(row_warm.sum() * 0.01),  # Assuming 100m resolution
+            'hotspot_count': int(row_hot.sum())
+        }
+    
     def export_summary_report(
         self,
         metrics: Dict,
@@ -181,8 +415,7 @@ class ProductGenerator:
             ]
         }
         
-        with open(output_path, 'w') as f:
-            json.dump(report, f, indent=2)
+        _write_json(Path(output_path), report)
         
         logger.info(f"✅ Summary report saved to {output_path}")
     
@@ -211,15 +444,26 @@ class ProductGenerator:
         
         # Generate time series
         products['timeseries'] = self.generate_time_series(predictions, metadata)
+        zarr_path = self.output_dir / 'temperature_timeseries.zarr'
+        if "zarr" in self.output_formats and zarr_path.exists():
+            products['timeseries_zarr'] = zarr_path
         
         # Calculate UHI indicators (using mean of all predictions)
-        mean_temp = np.mean([pred for pred in predictions.values()], axis=0)
+        # Running sum: no (time, lat, lon) temporary
+        mean_temp = None
+        for pred in predictions.values():
+            if mean_temp is None:
+                mean_temp = pred.astype(np.float64)
+            else:
+                mean_temp += pred
+        mean_temp /= len(predictions)
+        # Indicators only need ~0.01 °C: float32 halves the bytes scanned
+        mean_temp = mean_temp.astype(np.float32, copy=False)
         indicators = self.generate_uhi_indicators(mean_temp, reference_temp, metadata)
         
         # Save indicators
         indicators_path = self.output_dir / 'uhi_indicators.json'
-        with open(indicators_path, 'w') as f:
-            json.dump(indicators, f, indent=2)
+        _write_json(indicators_path, indicators)
         products['indicators'] = indicators_path
         
         # Generate summary report
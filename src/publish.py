@@ -9,16 +9,16 @@ Exports final outputs in standard formats:
 Phase 1: Exports mock data with proper formatting
 """
 
-import json
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any
 import numpy as np
 import rasterio
-from rasterio.plot import show
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend
-import matplotlib.pyplot as plt
+from rasterio.shutil import copy as rio_copy
+from pydantic_core import to_json
 
 from src.models import Manifest, RasterMetadata, Bounds
 
@@ -29,7 +29,7 @@ logger = logging.getLogger(__name__)
 def export_geotiff(
     input_path: Path,
     output_path: Path,
-    compress: str = "lzw",
+    compress: str = "zstd",
     tiled: bool = True
 ) -> RasterMetadata:
     """
@@ -38,8 +38,8 @@ def export_geotiff(
     Args:
         input_path: Source raster
         output_path: Destination COG
-        compress: Compression method
-        tiled: Whether to tile output
+        compress: Compression method (compressed with all CPU threads)
+        tiled: Whether to tile output (COG layout with overviews)
         
     Returns:
         Metadata of exported raster
@@ -47,74 +47,156 @@ def export_geotiff(
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
     with rasterio.open(input_path) as src:
-        # Copy with COG-friendly options
-        profile = src.profile.copy()
-        profile.update({
-            'driver': 'GTiff',
-            'compress': compress,
-            'tiled': tiled,
-            'blockxsize': 512,
-            'blockysize': 512,
-            'interleave': 'band'
-        })
+        # Floating-point predictor for float rasters, horizontal otherwise
+        predictor = 3 if np.issubdtype(np.dtype(src.dtypes[0]), np.floating) else 2
         
-        with rasterio.open(output_path, 'w', **profile) as dst:
-            for i in range(1, src.count + 1):
-                dst.write(src.read(i), i)
-                if src.descriptions[i-1]:
-                    dst.set_band_description(i, src.descriptions[i-1])
-        
-        # Extract metadata
-        with rasterio.open(output_path) as dst:
-            bounds = dst.bounds
-            metadata = RasterMetadata(
-                crs=str(dst.crs),
-                transform=list(dst.transform)[:6],
-                width=dst.width,
-                height=dst.height,
-                nodata=dst.nodata,
-                dtype=str(dst.dtypes[0]),
-                bounds=Bounds(
-                    minx=bounds.left,
-                    miny=bounds.bottom,
-                    maxx=bounds.right,
-                    maxy=bounds.top
-                ),
-                band_count=dst.count
-            )
+        # The copy keeps grid, dtype, nodata and scaling: take the metadata
+        # from the source instead of reopening the output
+        bounds = src.bounds
+        metadata = RasterMetadata(
+            crs=str(src.crs),
+            transform=list(src.transform)[:6],
+            width=src.width,
+            height=src.height,
+            nodata=src.nodata,
+            dtype=str(src.dtypes[0]),
+            bounds=Bounds(
+                minx=bounds.left,
+                miny=bounds.bottom,
+                maxx=bounds.right,
+                maxy=bounds.top
+            ),
+            band_count=src.count,
+            scale_factor=src.scales[0],
+            add_offset=src.offsets[0]
+        )
+    
+    # Copy through GDAL's CreateCopy (COG driver when tiled): blocks are
+    # streamed and compressed with all CPU threads, and band descriptions,
+    # scales and offsets are carried over
+    creation_options = {
+        'compress': compress,
+        'predictor': predictor,
+        'num_threads': 'all_cpus',
+        'BIGTIFF': 'IF_SAFER'
+    }
+    if compress.lower() == 'zstd':
+        creation_options['level'] = 3
+    if tiled:
+        rio_copy(input_path, output_path, driver='COG', blocksize=512, **creation_options)
+    else:
+        rio_copy(input_path, output_path, driver='GTiff', interleave='band', **creation_options)
     
     logger.info(f"✅ Exported GeoTIFF: {output_path.name}")
     return metadata
 
 
+def legend_path(preview_path: Path) -> Path:
+    """Colorbar legend written next to a PNG preview (<stem>_legend.png)"""
+    return preview_path.with_name(f"{preview_path.stem}_legend.png")
+
+
+@lru_cache(maxsize=1)
+def _legend_figure():
+    """
+    Horizontal colorbar figure shared by all legends of the process
+    
+    Built once (a new matplotlib Figure costs about as much as the whole
+    preview); export_png_legend only swaps its colormap, range and label.
+    
+    Returns:
+        (figure, colorbar, mappable) tuple
+    """
+    # Imported here: only previews need them (Figure renders without pyplot)
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.figure import Figure
+    
+    fig = Figure(figsize=(6, 0.8))
+    cax = fig.add_axes([0.05, 0.55, 0.9, 0.3])
+    mappable = ScalarMappable()
+    colorbar = fig.colorbar(mappable, cax=cax, orientation='horizontal')
+    return fig, colorbar, mappable
+
+
+def export_png_legend(
+    output_path: Path,
+    vmin: float,
+    vmax: float,
+    title: str = "Temperature",
+    cmap: str = "RdYlBu_r"
+) -> Path:
+    """
+    Generate a horizontal colorbar legend for a PNG preview
+    
+    Reuses one figure across calls (see _legend_figure), so legends are
+    drawn one at a time.
+    
+    Args:
+        output_path: Destination PNG
+        vmin: Value at the low end of the colormap
+        vmax: Value at the high end of the colormap
+        title: Colorbar label
+        cmap: Matplotlib colormap name
+        
+    Returns:
+        Path to PNG
+    """
+    fig, colorbar, mappable = _legend_figure()
+    mappable.set_cmap(cmap)
+    mappable.set_clim(vmin, vmax)
+    colorbar.set_label(title)
+    fig.savefig(output_path, dpi=150, bbox_inches='tight')
+    return output_path
+
+
 def export_png_preview(
     input_path: Path,
     output_path: Path,
-    title: str = "Temperature"
+    title: str = "Temperature",
+    cmap: str = "RdYlBu_r"
 ) -> Path:
     """
     Generate PNG preview of raster
     
+    The pixels are colour-mapped directly (one image pixel per raster
+    pixel, nodata transparent) instead of drawing a matplotlib figure; the
+    title, colormap and value range are stored as PNG text chunks, and the
+    colorbar is drawn once into a small legend PNG next to the preview
+    (see legend_path).
+    
     Args:
         input_path: Source raster
         output_path: Destination PNG
         title: Title for plot
+        cmap: Matplotlib colormap name
         
     Returns:
         Path to PNG
     """
+    # Imported here: only previews need them
+    import matplotlib
+    from PIL import Image, PngImagePlugin
+    
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
     with rasterio.open(input_path) as src:
-        data = src.read(1)
-        
-        fig, ax = plt.subplots(figsize=(10, 8))
-        im = ax.imshow(data, cmap='RdYlBu_r')
-        ax.set_title(title)
-        plt.colorbar(im, ax=ax, label='°C')
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=150, bbox_inches='tight')
-        plt.close()
+        # Decode scaled integers and hide nodata
+        data = src.read(1, masked=True) * src.scales[0] + src.offsets[0]
+    data = np.ma.masked_invalid(data)
+    
+    # Stretch to the value range; masked pixels take the colormap's
+    # transparent "bad" colour
+    vmin, vmax = (float(data.min()), float(data.max())) if data.count() else (0.0, 0.0)
+    norm = (data - vmin) / (vmax - vmin) if vmax > vmin else data * 0.0
+    rgba = matplotlib.colormaps[cmap](norm, bytes=True)
+    
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Title", title)
+    info.add_text("Colormap", cmap)
+    info.add_text("Minimum", f"{vmin:g}")
+    info.add_text("Maximum", f"{vmax:g}")
+    Image.fromarray(rgba).save(output_path, pnginfo=info, compress_level=1)
+    export_png_legend(legend_path(output_path), vmin, vmax, title=title, cmap=cmap)
     
     logger.info(f"✅ Generated preview: {output_path.name}")
     return output_path
@@ -136,8 +218,8 @@ def publish_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     if not manifest.paths or not manifest.paths.intermediate:
         raise ValueError("No intermediate data path in manifest")
     
-    intermediate_dir = Path(manifest.paths.intermediate.replace("gs://", "/tmp/gcs/"))
-    exports_dir = Path(manifest.paths.exports.replace("gs://", "/tmp/gcs/"))
+    intermediate_dir = manifest.paths.local_intermediate
+    exports_dir = manifest.paths.local_exports
     exports_dir.mkdir(parents=True, exist_ok=True)
     
     output_formats = config.get("output", {}).get("formats", ["geotiff", "png", "metadata"])
@@ -145,53 +227,64 @@ def publish_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     exported_files = []
     metadata_dict = {}
     
-    # Export temperature raster
+    # Rasters to export: (name, input, output stem, preview title)
+    sources = []
     temp_input = intermediate_dir / "t2m_reprojected.tif"
     if temp_input.exists():
-        if "geotiff" in output_formats:
-            temp_output = exports_dir / f"{manifest.city}_temperature.tif"
-            metadata = export_geotiff(temp_input, temp_output)
-            metadata_dict["temperature"] = metadata.to_json()
-            exported_files.append(str(temp_output))
-        
-        if "png" in output_formats:
-            png_output = exports_dir / f"{manifest.city}_temperature.png"
-            export_png_preview(
-                temp_input, 
-                png_output, 
-                title=f"{manifest.city.title()} - Temperature (°C)"
-            )
-            exported_files.append(str(png_output))
+        sources.append((
+            "temperature",
+            temp_input,
+            f"{manifest.city}_temperature",
+            f"{manifest.city.title()} - Temperature (°C)"
+        ))
     
     # Export feature indices if available
-    features_dir = Path(manifest.paths.features.replace("gs://", "/tmp/gcs/"))
+    features_dir = manifest.paths.local_features
     
     for feature in ["ndvi", "ndbi"]:
         feature_input = features_dir / f"{feature}.tif"
         if feature_input.exists():
-            if "geotiff" in output_formats:
-                feature_output = exports_dir / f"{manifest.city}_{feature}.tif"
-                metadata = export_geotiff(feature_input, feature_output)
-                metadata_dict[feature] = metadata.to_json()
-                exported_files.append(str(feature_output))
-            
-            if "png" in output_formats:
-                png_output = exports_dir / f"{manifest.city}_{feature}.png"
-                cmap = 'YlGn' if feature == "ndvi" else 'Greys'
-                export_png_preview(feature_input, png_output, title=f"{manifest.city.title()} - {feature.upper()}")
-                exported_files.append(str(png_output))
+            sources.append((
+                feature,
+                feature_input,
+                f"{manifest.city}_{feature}",
+                f"{manifest.city.title()} - {feature.upper()}"
+            ))
+    
+    # GeoTIFFs are exported concurrently (GDAL releases the GIL while
+    # reading, compressing and writing); the previews are cheap and are
+    # written afterwards
+    geotiff_metadata = []
+    if "geotiff" in output_formats and sources:
+        with ThreadPoolExecutor(max_workers=min(len(sources), os.cpu_count() or 1)) as executor:
+            geotiff_metadata = list(executor.map(
+                lambda source: export_geotiff(source[1], exports_dir / f"{source[2]}.tif"),
+                sources
+            ))
+    
+    for i, (name, input_path, stem, title) in enumerate(sources):
+        if "geotiff" in output_formats:
+            metadata_dict[name] = geotiff_metadata[i]
+            exported_files.append(str(exports_dir / f"{stem}.tif"))
+        
+        if "png" in output_formats:
+            png_output = exports_dir / f"{stem}.png"
+            export_png_preview(input_path, png_output, title=title)
+            exported_files.append(str(png_output))
+            exported_files.append(str(legend_path(png_output)))
     
     # Save metadata
     if "metadata" in output_formats:
         metadata_output = exports_dir / "export_metadata.json"
-        with open(metadata_output, 'w') as f:
-            json.dump({
-                "city": manifest.city,
-                "period": manifest.period.model_dump(),
-                "grid": manifest.grid.model_dump(),
-                "files": exported_files,
-                "rasters": metadata_dict
-            }, f, indent=2)
+        # Models are serialized in place by pydantic's encoder, without
+        # intermediate dicts
+        metadata_output.write_bytes(to_json({
+            "city": manifest.city,
+            "period": manifest.period,
+            "grid": manifest.grid,
+            "files": exported_files,
+            "rasters": metadata_dict
+        }, indent=2))
         logger.info(f"✅ Metadata saved: {metadata_output}")
     
     manifest.stage = "publish"
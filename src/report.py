@@ -1,62 +1,166 @@
 """
 GenHack Climate - Report Generation
 
-Generates HTML and PDF reports using Jinja2 templates and Weasyprint.
+Generates HTML and PDF reports using Jinja2 templates and Weasyprint
+(or headless Chromium through Playwright, with output.report.pdf_backend).
 """
 
+import atexit
 import json
 import logging
+import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, NamedTuple, Optional
 from datetime import datetime
 from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
 
 from src.models import Manifest, Indicators, Metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-def load_indicators(exports_dir: Path) -> Optional[Indicators]:
+
+
+class MapConfig(NamedTuple):
+    """Map preview shown in the report"""
+    filename: str
+    title: str
+    caption: str
+
+
+MAP_CONFIGS = (
+    MapConfig("temperature.png", "Temperature Distribution", "2-meter temperature"),
+    MapConfig("ndvi.png", "Vegetation Index (NDVI)", "Normalized Difference Vegetation Index"),
+    MapConfig("ndbi.png", "Built-up Index (NDBI)", "Normalized Difference Built-up Index")
+)
+
+
+@lru_cache(maxsize=8)
+def _get_template(template_dir: str):
+    """Compiled report template, parsed once per template directory"""
+    env = Environment(loader=FileSystemLoader(template_dir), auto_reload=False)
+    return env.get_template("report.html.j2")
+
+
+@lru_cache(maxsize=None)
+def _weasyprint_html():
+    """WeasyPrint's HTML class, imported on first PDF (None when unavailable)"""
+    try:
+        from weasyprint import HTML
+    except (ImportError, OSError):
+        return None
+    return HTML
+
+
+@lru_cache(maxsize=None)
+def _chromium_browser():
+    """Headless Chromium shared by all reports of the process, closed at exit"""
+    from playwright.sync_api import sync_playwright
+    
+    playwright = sync_playwright().start()
+    atexit.register(playwright.stop)
+    browser = playwright.chromium.launch()
+    atexit.register(browser.close)
+    return browser
+
+
+def write_pdf(html_path: Path, html_content: str, pdf_path: Path, backend: str = "weasyprint"):
+    """
+    Render an HTML report to PDF
+    
+    Args:
+        html_path: Saved HTML report (relative resources resolve against it)
+        html_content: HTML report content
+        pdf_path: Destination PDF
+        backend: "weasyprint" or "chromium" (Playwright, one browser reused
+            across reports)
+    """
+    if backend == "chromium":
+        page = _chromium_browser().new_page()
+        try:
+            page.goto(html_path.resolve().as_uri())
+            page.pdf(path=str(pdf_path), format="A4", print_background=True)
+        finally:
+            page.close()
+    elif backend == "weasyprint":
+        HTML = _weasyprint_html()
+        if HTML is None:
+            raise ImportError("weasyprint is required for PDF reports. Install with: pip install weasyprint")
+        HTML(string=html_content, base_url=str(html_path.parent)).write_pdf(pdf_path)
+    else:
+        raise ValueError(f"Unknown PDF backend: {backend}")
+
+
+def _read_json(path: str) -> Any:
+    """Parse a JSON file (orjson when available)"""
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path) as f:
+        return json.load(f)
+
+
+def scan_exports(exports_dir: Path) -> Dict[str, os.DirEntry]:
+    """Entries of the exports directory by file name, from a single scandir"""
+    if not exports_dir.is_dir():
+        return {}
+    with os.scandir(exports_dir) as it:
+        return {entry.name: entry for entry in it}
+
+
+def load_indicators(
+    exports_dir: Path,
+    entries: Optional[Dict[str, os.DirEntry]] = None
+) -> Optional[Indicators]:
     """Load indicators from JSON file"""
-    indicators_path = exports_dir / "indicators.json"
-    if indicators_path.exists():
-        with open(indicators_path) as f:
-            data = json.load(f)
-            return Indicators(**data)
+    if entries is None:
+        entries = scan_exports(exports_dir)
+    if "indicators.json" in entries:
+        return Indicators(**_read_json(entries["indicators.json"].path))
     return None
 
 
-def load_metrics(exports_dir: Path) -> Optional[Metrics]:
+def load_metrics(
+    exports_dir: Path,
+    entries: Optional[Dict[str, os.DirEntry]] = None
+) -> Optional[Metrics]:
     """Load metrics from JSON file"""
-    metrics_path = exports_dir / "metrics.json"
-    if metrics_path.exists():
-        with open(metrics_path) as f:
-            data = json.load(f)
-            return Metrics(**data)
+    if entries is None:
+        entries = scan_exports(exports_dir)
+    if "metrics.json" in entries:
+        return Metrics(**_read_json(entries["metrics.json"].path))
     return None
 
 
-def collect_maps(exports_dir: Path) -> List[Dict[str, str]]:
-    """Collect PNG map previews"""
-    maps = []
-    
-    map_configs = [
-        ("temperature.png", "Temperature Distribution", "2-meter temperature"),
-        ("ndvi.png", "Vegetation Index (NDVI)", "Normalized Difference Vegetation Index"),
-        ("ndbi.png", "Built-up Index (NDBI)", "Normalized Difference Built-up Index")
-    ]
-    
-    for filename, title, caption in map_configs:
-        map_path = exports_dir / f"{exports_dir.parent.parent.name}_{filename}"
-        if map_path.exists():
-            maps.append({
-                "path": str(map_path),
-                "title": title,
-                "caption": caption
-            })
+def collect_maps(
+    exports_dir: Path,
+    entries: Optional[Dict[str, os.DirEntry]] = None
+) -> List[Dict[str, str]]:
+    """Collect PNG map previews (with their colorbar legends when exported)"""
+    if entries is None:
+        entries = scan_exports(exports_dir)
     
+    prefix = exports_dir.parent.parent.name
+    expected = {f"{prefix}_{config.filename}": config for config in MAP_CONFIGS}
+    maps = []
+    for map_name, config in expected.items():
+        if map_name not in entries:
+            continue
+        # Written next to the preview by publish.export_png_preview
+        legend_name = f"{Path(map_name).stem}_legend.png"
+        maps.append({
+            "path": str(exports_dir / map_name),
+            "legend": str(exports_dir / legend_name) if legend_name in entries else None,
+            "title": config.title,
+            "caption": config.caption
+        })
     return maps
 
 
@@ -80,12 +184,13 @@ def generate_report(
     """
     logger.info("🔄 Generating report...")
     
-    exports_dir = Path(manifest.paths.exports.replace("gs://", "/tmp/gcs/"))
+    exports_dir = manifest.paths.local_exports
     
-    # Load data
-    indicators = load_indicators(exports_dir)
-    metrics = load_metrics(exports_dir)
-    maps = collect_maps(exports_dir)
+    # Load data (one directory listing for all lookups)
+    entries = scan_exports(exports_dir)
+    indicators = load_indicators(exports_dir, entries)
+    metrics = load_metrics(exports_dir, entries)
+    maps = collect_maps(exports_dir, entries)
     
     # Prepare template context
     context = {
@@ -96,8 +201,9 @@ def generate_report(
         "crs": manifest.grid.crs,
         "generated_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
         "mode_dry_run": manifest.mode.dry_run if manifest.mode else False,
-        "indicators": indicators.model_dump() if indicators else None,
-        "metrics": metrics.model_dump() if metrics else None,
+        # Models are passed as-is: the template only reads attributes
+        "indicators": indicators,
+        "metrics": metrics,
         "maps": maps,
         "include_maps": config.get("output", {}).get("report", {}).get("include_maps", True),
         "include_metrics": config.get("output", {}).get("report", {}).get("include_metrics", True),
@@ -106,8 +212,7 @@ def generate_report(
     }
     
     # Setup Jinja2
-    env = Environment(loader=FileSystemLoader(str(template_dir)))
-    template = env.get_template("report.html.j2")
+    template = _get_template(str(template_dir))
     
     # Render HTML
     html_content = template.render(**context)
@@ -123,11 +228,12 @@ def generate_report(
     logger.info(f"✅ HTML report: {html_path}")
     
     # Generate PDF
-    report_formats = config.get("output", {}).get("report", {}).get("format", ["html", "pdf"])
+    report_config = config.get("output", {}).get("report", {})
+    report_formats = report_config.get("format", ["html", "pdf"])
     if "pdf" in report_formats:
         try:
             pdf_path = output_dir / f"{manifest.city}_report.pdf"
-            HTML(string=html_content, base_url=str(output_dir)).write_pdf(pdf_path)
+            write_pdf(html_path, html_content, pdf_path, report_config.get("pdf_backend", "weasyprint"))
             outputs['pdf'] = pdf_path
             logger.info(f"✅ PDF report: {pdf_path}")
         except Exception as e:
@@ -158,7 +264,7 @@ def report_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
     if not manifest.paths or not manifest.paths.exports:
         raise ValueError("No exports path in manifest")
     
-    exports_dir = Path(manifest.paths.exports.replace("gs://", "/tmp/gcs/"))
+    exports_dir = manifest.paths.local_exports
     
     # Generate reports
     outputs = generate_report(config, manifest, template_dir, exports_dir)
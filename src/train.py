@@ -10,7 +10,6 @@ from typing import Dict, Any
 
 from src.models import Manifest
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -33,6 +32,8 @@ def train_stage(config: Dict[str, Any], manifest: Manifest) -> Manifest:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     from models import Manifest, Period, Grid
     
     test_manifest = Manifest(
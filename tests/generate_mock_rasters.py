@@ -5,11 +5,120 @@ Utility script to generate synthetic raster data for testing.
 Used by test suites and local development.
 """
 
+import os
 import numpy as np
 import rasterio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from rasterio.enums import Resampling
 from rasterio.transform import from_bounds
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
+
+# Seeded PCG64 generator for the synthetic noise. Child generators come
+# from the seed sequence (Generator.spawn needs NumPy >= 1.25)
+_SEED_SEQUENCE = np.random.SeedSequence(20220715)
+_RNG = np.random.default_rng(_SEED_SEQUENCE)
+
+# Internal overview levels written when cog=True
+OVERVIEW_LEVELS = [2, 4, 8, 16]
+
+
+@lru_cache(maxsize=8)
+def _grid_and_dist(width: int, height: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Unit-square coordinate grids and distance to the center, per raster shape
+    
+    The arrays are shared between calls and therefore read-only.
+    
+    Args:
+        width, height: Raster dimensions
+        
+    Returns:
+        (xx, yy, dist) arrays of shape (height, width)
+    """
+    x = np.linspace(0, 1, width)
+    y = np.linspace(0, 1, height)
+    xx, yy = np.meshgrid(x, y)
+    
+    center_x, center_y = 0.5, 0.5
+    dist = np.sqrt((xx - center_x)**2 + (yy - center_y)**2)
+    
+    for array in (xx, yy, dist):
+        array.flags.writeable = False
+    return xx, yy, dist
+
+
+def write_raster(
+    output_path: Path,
+    data: np.ndarray,
+    bbox: Tuple[float, float, float, float],
+    band_name: str,
+    units: str,
+    cog: bool = False,
+    atomic: bool = True
+) -> None:
+    """
+    Write a single-band float32 GeoTIFF
+    
+    Tiled 256x256 with DEFLATE and the floating-point predictor. With
+    cog=True, averaged internal overviews are added so zoomed-out reads
+    touch only the overview. With atomic=True the file is encoded in
+    memory and renamed into place, so readers never see a partial file.
+    
+    Args:
+        output_path: Destination file path
+        data: 2D array of values
+        bbox: Bounding box (minx, miny, maxx, maxy) in WGS84
+        band_name: Band description
+        units: Band units tag
+        cog: Also build internal overviews
+        atomic: Encode in a MemoryFile and replace the destination at once
+    """
+    height, width = data.shape
+    profile = dict(
+        driver='GTiff',
+        height=height,
+        width=width,
+        count=1,
+        dtype='float32',
+        crs='EPSG:4326',
+        transform=from_bounds(*bbox, width, height),
+        compress='deflate',
+        predictor=3,
+        zlevel=6,
+        tiled=True,
+        blockxsize=256,
+        blockysize=256
+    )
+    
+    def fill(dst: rasterio.io.DatasetWriter) -> None:
+        dst.write(data.astype('float32', copy=False), 1)
+        dst.set_band_description(1, band_name)
+        dst.update_tags(1, units=units)
+        if cog:
+            levels = [level for level in OVERVIEW_LEVELS if min(height, width) // level >= 1]
+            dst.build_overviews(levels, Resampling.average)
+            dst.update_tags(ns='rio_overview', resampling='average')
+    
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if not atomic:
+        with rasterio.open(output_path, 'w', **profile) as dst:
+            fill(dst)
+        return
+    
+    with rasterio.MemoryFile() as memfile:
+        with memfile.open(**profile) as dst:
+            fill(dst)
+        encoded = memfile.read()
+    
+    # Same directory, so the rename cannot cross filesystems
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    try:
+        tmp_path.write_bytes(encoded)
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
 
 def generate_temperature_raster(
@@ -18,7 +127,9 @@ def generate_temperature_raster(
     height: int = 256,
     bbox: Tuple[float, float, float, float] = (2.224, 48.815, 2.470, 48.902),
     base_temp: float = 25.0,
-    uhi_intensity: float = 8.0
+    uhi_intensity: float = 8.0,
+    cog: bool = False,
+    rng: Optional[np.random.Generator] = None
 ) -> Path:
     """
     Generate synthetic temperature raster with urban heat island pattern
@@ -29,43 +140,26 @@ def generate_temperature_raster(
         bbox: Bounding box (minx, miny, maxx, maxy) in WGS84
         base_temp: Base temperature (°C)
         uhi_intensity: Urban heat island intensity (°C)
+        cog: Also build internal overviews
+        rng: Random generator for the noise (default: module generator)
     """
     # Create spatial gradient (urban heat island - warmer in center)
-    x = np.linspace(0, 1, width)
-    y = np.linspace(0, 1, height)
-    xx, yy = np.meshgrid(x, y)
+    _, _, dist = _grid_and_dist(width, height)
     
-    center_x, center_y = 0.5, 0.5
-    dist = np.sqrt((xx - center_x)**2 + (yy - center_y)**2)
-    
-    # Temperature: exponential decay from center
-    temperature = base_temp + uhi_intensity * np.exp(-5 * dist)
+    # Temperature: exponential decay from center, one float32 buffer
+    # updated in place
+    temperature = np.multiply(dist, -5, dtype=np.float32)
+    np.exp(temperature, out=temperature)
+    temperature *= uhi_intensity
+    temperature += base_temp
     
     # Add realistic noise
-    noise = np.random.normal(0, 1.5, (height, width))
+    noise = (rng or _RNG).standard_normal((height, width), dtype=np.float32)
+    noise *= 1.5
     temperature += noise
     
-    # Affine transform
-    transform = from_bounds(*bbox, width, height)
-    
     # Write GeoTIFF
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with rasterio.open(
-        output_path,
-        'w',
-        driver='GTiff',
-        height=height,
-        width=width,
-        count=1,
-        dtype='float32',
-        crs='EPSG:4326',
-        transform=transform,
-        compress='lzw',
-        tiled=True
-    ) as dst:
-        dst.write(temperature.astype('float32'), 1)
-        dst.set_band_description(1, 't2m')
-        dst.update_tags(1, units='celsius')
+    write_raster(output_path, temperature, bbox, 't2m', 'celsius', cog=cog)
     
     print(f"✅ Generated: {output_path}")
     return output_path
@@ -75,38 +169,25 @@ def generate_humidity_raster(
     output_path: Path,
     width: int = 256,
     height: int = 256,
-    bbox: Tuple[float, float, float, float] = (2.224, 48.815, 2.470, 48.902)
+    bbox: Tuple[float, float, float, float] = (2.224, 48.815, 2.470, 48.902),
+    cog: bool = False,
+    rng: Optional[np.random.Generator] = None
 ) -> Path:
     """Generate synthetic relative humidity raster"""
-    x = np.linspace(0, 1, width)
-    y = np.linspace(0, 1, height)
-    xx, yy = np.meshgrid(x, y)
+    _, _, dist = _grid_and_dist(width, height)
     
     # Humidity: inverse of temperature pattern
-    center_x, center_y = 0.5, 0.5
-    dist = np.sqrt((xx - center_x)**2 + (yy - center_y)**2)
-    humidity = 60.0 - 15.0 * np.exp(-5 * dist) + np.random.normal(0, 5, (height, width))
-    humidity = np.clip(humidity, 0, 100)
-    
-    transform = from_bounds(*bbox, width, height)
+    humidity = np.multiply(dist, -5, dtype=np.float32)
+    np.exp(humidity, out=humidity)
+    humidity *= -15.0
+    humidity += 60.0
+    noise = (rng or _RNG).standard_normal((height, width), dtype=np.float32)
+    noise *= 5
+    humidity += noise
+    np.clip(humidity, 0, 100, out=humidity)
     
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with rasterio.open(
-        output_path,
-        'w',
-        driver='GTiff',
-        height=height,
-        width=width,
-        count=1,
-        dtype='float32',
-        crs='EPSG:4326',
-        transform=transform,
-        compress='lzw',
-        tiled=True
-    ) as dst:
-        dst.write(humidity.astype('float32'), 1)
-        dst.set_band_description(1, 'rh')
-        dst.update_tags(1, units='percent')
+    # Write GeoTIFF
+    write_raster(output_path, humidity, bbox, 'rh', 'percent', cog=cog)
     
     print(f"✅ Generated: {output_path}")
     return output_path
@@ -117,58 +198,57 @@ def generate_wind_raster(
     component: str = 'u',
     width: int = 256,
     height: int = 256,
-    bbox: Tuple[float, float, float, float] = (2.224, 48.815, 2.470, 48.902)
+    bbox: Tuple[float, float, float, float] = (2.224, 48.815, 2.470, 48.902),
+    cog: bool = False,
+    rng: Optional[np.random.Generator] = None
 ) -> Path:
     """Generate synthetic wind component raster"""
-    x = np.linspace(0, 1, width)
-    y = np.linspace(0, 1, height)
-    xx, yy = np.meshgrid(x, y)
+    xx, yy, _ = _grid_and_dist(width, height)
     
     # Wind: sinusoidal pattern
     if component == 'u':
-        wind = 2.0 + 3.0 * np.sin(5 * xx) + np.random.normal(0, 0.5, (height, width))
+        wind = np.multiply(xx, 5, dtype=np.float32)
+        np.sin(wind, out=wind)
+        wind *= 3.0
+        wind += 2.0
     else:  # v component
-        wind = 1.0 + 2.5 * np.cos(5 * yy) + np.random.normal(0, 0.5, (height, width))
-    
-    transform = from_bounds(*bbox, width, height)
+        wind = np.multiply(yy, 5, dtype=np.float32)
+        np.cos(wind, out=wind)
+        wind *= 2.5
+        wind += 1.0
+    noise = (rng or _RNG).standard_normal((height, width), dtype=np.float32)
+    noise *= 0.5
+    wind += noise
     
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with rasterio.open(
-        output_path,
-        'w',
-        driver='GTiff',
-        height=height,
-        width=width,
-        count=1,
-        dtype='float32',
-        crs='EPSG:4326',
-        transform=transform,
-        compress='lzw',
-        tiled=True
-    ) as dst:
-        dst.write(wind.astype('float32'), 1)
-        dst.set_band_description(1, f'{component}10')
-        dst.update_tags(1, units='m/s')
+    # Write GeoTIFF
+    write_raster(output_path, wind, bbox, f'{component}10', 'm/s', cog=cog)
     
     print(f"✅ Generated: {output_path}")
     return output_path
 
 
-def generate_test_suite(output_dir: Path) -> None:
+def generate_test_suite(output_dir: Path, cog: bool = False) -> None:
     """Generate complete test suite of rasters"""
     print("🔨 Generating test rasters...")
     
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Temperature
-    generate_temperature_raster(output_dir / "t2m.tif")
-    
-    # Humidity
-    generate_humidity_raster(output_dir / "rh.tif")
-    
-    # Wind components
-    generate_wind_raster(output_dir / "u10.tif", component='u')
-    generate_wind_raster(output_dir / "v10.tif", component='v')
+    # Rasters are independent: generate them concurrently (NumPy ufuncs and
+    # libtiff compression release the GIL). Each raster gets its own child
+    # generator so the noise does not depend on thread scheduling.
+    rngs = [np.random.default_rng(seed) for seed in _SEED_SEQUENCE.spawn(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            # Temperature
+            executor.submit(generate_temperature_raster, output_dir / "t2m.tif", cog=cog, rng=rngs[0]),
+            # Humidity
+            executor.submit(generate_humidity_raster, output_dir / "rh.tif", cog=cog, rng=rngs[1]),
+            # Wind components
+            executor.submit(generate_wind_raster, output_dir / "u10.tif", component='u', cog=cog, rng=rngs[2]),
+            executor.submit(generate_wind_raster, output_dir / "v10.tif", component='v', cog=cog, rng=rngs[3]),
+        ]
+        for future in futures:
+            future.result()
     
     print(f"\n✅ Test suite complete: {output_dir}")
     print(f"   Files: {len(list(output_dir.glob('*.tif')))}")
@@ -6,23 +6,35 @@ Validates that pipeline stages produce data matching JSON schemas.
 
 import json
 import pytest
+from functools import lru_cache
 from pathlib import Path
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
+from jsonschema.validators import validator_for
 
 # Paths
 SCHEMAS_DIR = Path(__file__).parent.parent / "schemas"
 
 
+@lru_cache(maxsize=None)
 def load_schema(schema_name: str):
-    """Load JSON schema"""
+    """Load JSON schema (parsed once per run)"""
     schema_path = SCHEMAS_DIR / f"{schema_name}.schema.json"
     with open(schema_path) as f:
         return json.load(f)
 
 
+@lru_cache(maxsize=None)
+def load_validator(schema_name: str):
+    """Checked validator for a schema, built once for the draft its $schema names"""
+    schema = load_schema(schema_name)
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
 def test_manifest_schema():
     """Test manifest schema validation"""
-    schema = load_schema("manifest")
+    validator = load_validator("manifest")
     
     # Valid manifest
     valid_manifest = {
@@ -42,7 +54,7 @@ def test_manifest_schema():
     }
     
     # Should not raise
-    validate(instance=valid_manifest, schema=schema)
+    validator.validate(valid_manifest)
     
     # Invalid manifest (missing required field)
     invalid_manifest = {
@@ -56,12 +68,12 @@ def test_manifest_schema():
     }
     
     with pytest.raises(ValidationError):
-        validate(instance=invalid_manifest, schema=schema)
+        validator.validate(invalid_manifest)
 
 
 def test_raster_metadata_schema():
     """Test raster metadata schema validation"""
-    schema = load_schema("raster_metadata")
+    validator = load_validator("raster_metadata")
     
     # Valid metadata
     valid_metadata = {
@@ -79,7 +91,7 @@ def test_raster_metadata_schema():
         }
     }
     
-    validate(instance=valid_metadata, schema=schema)
+    validator.validate(valid_metadata)
     
     # Invalid metadata (negative dimensions)
     invalid_metadata = {
@@ -91,12 +103,12 @@ def test_raster_metadata_schema():
     }
     
     with pytest.raises(ValidationError):
-        validate(instance=invalid_metadata, schema=schema)
+        validator.validate(invalid_metadata)
 
 
 def test_metrics_schema():
     """Test metrics schema validation"""
-    schema = load_schema("metrics")
+    validator = load_validator("metrics")
     
     # Valid metrics (placeholders OK)
     valid_metrics = {
@@ -109,7 +121,7 @@ def test_metrics_schema():
         "evaluation_date": "2024-01-01T12:00:00Z"
     }
     
-    validate(instance=valid_metrics, schema=schema)
+    validator.validate(valid_metrics)
     
     # Valid metrics with values
     valid_metrics_with_values = {
@@ -124,12 +136,12 @@ def test_metrics_schema():
         "evaluation_date": "2024-01-01T12:00:00Z"
     }
     
-    validate(instance=valid_metrics_with_values, schema=schema)
+    validator.validate(valid_metrics_with_values)
 
 
 def test_indicators_schema():
     """Test indicators schema validation"""
-    schema = load_schema("indicators")
+    validator = load_validator("indicators")
     
     # Valid indicators
     valid_indicators = {
@@ -146,7 +158,7 @@ def test_indicators_schema():
         "computed_at": "2024-01-01T12:00:00Z"
     }
     
-    validate(instance=valid_indicators, schema=schema)
+    validator.validate(valid_indicators)
     
     # Valid with nulls (Phase 1)
     valid_indicators_nulls = {
@@ -157,7 +169,7 @@ def test_indicators_schema():
         "computed_at": "2024-01-01T12:00:00Z"
     }
     
-    validate(instance=valid_indicators_nulls, schema=schema)
+    validator.validate(valid_indicators_nulls)
 
 
 def test_all_schemas_exist():
@@ -193,8 +205,8 @@ def test_pydantic_models_match_schemas():
         variables=["t2m"],
         stage="ingest"
     )
-    manifest_schema = load_schema("manifest")
-    validate(instance=manifest.to_json(), schema=manifest_schema)
+    manifest_validator = load_validator("manifest")
+    manifest_validator.validate(manifest.to_json())
     
     # Test RasterMetadata
     metadata = RasterMetadata(
@@ -205,18 +217,32 @@ def test_pydantic_models_match_schemas():
         dtype="float32",
         bounds=Bounds(minx=2.0e6, miny=5.9e6, maxx=2.1e6, maxy=6.0e6)
     )
-    metadata_schema = load_schema("raster_metadata")
-    validate(instance=metadata.to_json(), schema=metadata_schema)
+    metadata_validator = load_validator("raster_metadata")
+    metadata_validator.validate(metadata.to_json())
+    
+    # Test scaled-integer RasterMetadata (NDVI/NDBI)
+    metadata = RasterMetadata(
+        crs="EPSG:3857",
+        transform=[100.0, 0.0, 2.0e6, 0.0, -100.0, 6.0e6],
+        width=128,
+        height=128,
+        dtype="int16",
+        nodata=-32768,
+        units="index",
+        scale_factor=1e-4,
+        add_offset=0.0
+    )
+    metadata_validator.validate(metadata.to_json())
     
     # Test Metrics
     metrics = Metrics(baseline="bicubic", spatial_resolution_m=200)
-    metrics_schema = load_schema("metrics")
-    validate(instance=metrics.to_json(), schema=metrics_schema)
+    metrics_validator = load_validator("metrics")
+    metrics_validator.validate(metrics.to_json())
     
     # Test Indicators
     indicators = Indicators(threshold_c=30.0)
-    indicators_schema = load_schema("indicators")
-    validate(instance=indicators.to_json(), schema=indicators_schema)
+    indicators_validator = load_validator("indicators")
+    indicators_validator.validate(indicators.to_json())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,116 @@
+"""
+GenHack Climate - GADM Indicator Tests
+
+Checks zone temperature statistics on small synthetic ERA5 grids.
+"""
+
+import numpy as np
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+xr = pytest.importorskip("xarray")
+from shapely.geometry import box
+
+from src.gadm_indicators import GADMIndicatorCalculator
+
+
+def make_zones():
+    """Two side-by-side zones covering the west and east halves of the grid"""
+    return gpd.GeoDataFrame(
+        {'GID_2': ['Z.1', 'Z.2'], 'NAME_2': ['West', 'East']},
+        geometry=[box(0.0, 0.0, 2.0, 4.0), box(2.0, 0.0, 4.0, 4.0)],
+        crs="EPSG:4326"
+    )
+
+
+def test_temperature_indicators_pool_time_dimension(tmp_path):
+    """A 'time' dimension is pooled per zone instead of breaking the transpose"""
+    lats = np.array([3.5, 2.5, 1.5, 0.5])
+    lons = np.array([0.5, 1.5, 2.5, 3.5])
+    rng = np.random.default_rng(0)
+    t2m = rng.normal(295.0, 3.0, size=(3, len(lats), len(lons)))
+    t2m[1, 0, 0] = np.nan
+    era5_ds = xr.Dataset(
+        {'t2m': (('time', 'latitude', 'longitude'), t2m)},
+        coords={'time': np.arange(3), 'latitude': lats, 'longitude': lons}
+    )
+
+    calculator = GADMIndicatorCalculator(tmp_path / "gadm.gpkg")
+    results = calculator.calculate_temperature_indicators(era5_ds, make_zones())
+
+    for row, columns in zip(results.itertuples(), (slice(0, 2), slice(2, 4))):
+        expected = t2m[:, :, columns]
+        assert row.pixel_count == np.isfinite(expected).sum()
+        assert row.mean_temp == pytest.approx(np.nanmean(expected))
+        assert row.min_temp == pytest.approx(np.nanmin(expected))
+        assert row.max_temp == pytest.approx(np.nanmax(expected))
+        assert row.std_temp == pytest.approx(np.nanstd(expected))
+
+    # Latitude-first ordering of the extra dimension gives the same result
+    swapped = calculator.calculate_temperature_indicators(
+        era5_ds.transpose('latitude', 'time', 'longitude'), make_zones()
+    )
+    np.testing.assert_allclose(
+        swapped[['mean_temp', 'std_temp']].to_numpy(),
+        results[['mean_temp', 'std_temp']].to_numpy()
+    )
+
+
+def write_raster(path, data):
+    """Write a float32 EPSG:4326 raster covering (0, 0)-(4, 4)"""
+    import rasterio
+    from rasterio.transform import from_bounds
+
+    with rasterio.open(
+        path, 'w', driver='GTiff', height=data.shape[0], width=data.shape[1],
+        count=1, dtype='float32', crs='EPSG:4326',
+        transform=from_bounds(0.0, 0.0, 4.0, 4.0, data.shape[1], data.shape[0])
+    ) as dst:
+        dst.write(data.astype(np.float32), 1)
+    return path
+
+
+def test_zone_labels_not_shared_between_zone_sets(tmp_path):
+    """Zone sets with the same default IDs on one raster get their own labels"""
+    data = np.arange(16, dtype=np.float32).reshape(4, 4)
+    raster = write_raster(tmp_path / "values.tif", data)
+    calculator = GADMIndicatorCalculator(tmp_path / "gadm.gpkg")
+
+    # No GID columns: both sets fall back to the IDs 0 and 1
+    columns = gpd.GeoDataFrame(
+        geometry=[box(0.0, 0.0, 2.0, 4.0), box(2.0, 0.0, 4.0, 4.0)], crs="EPSG:4326"
+    )
+    rows = gpd.GeoDataFrame(
+        geometry=[box(0.0, 2.0, 4.0, 4.0), box(0.0, 0.0, 4.0, 2.0)], crs="EPSG:4326"
+    )
+
+    by_column = calculator.calculate_zonal_statistics(raster, columns)
+    by_row = calculator.calculate_zonal_statistics(raster, rows)
+
+    np.testing.assert_allclose(by_column['value'], [data[:, :2].mean(), data[:, 2:].mean()])
+    np.testing.assert_allclose(by_row['value'], [data[:2].mean(), data[2:].mean()])
+
+
+def test_raster_outside_zones_is_skipped(tmp_path):
+    """An NDVI raster overlapping no zone neither crashes nor adds rows"""
+    import rasterio
+    from rasterio.transform import from_bounds
+
+    inside = write_raster(tmp_path / "inside.tif", np.full((4, 4), 100.0))
+    outside = tmp_path / "outside.tif"
+    with rasterio.open(
+        outside, 'w', driver='GTiff', height=4, width=4, count=1, dtype='float32',
+        crs='EPSG:4326', transform=from_bounds(10.0, 10.0, 14.0, 14.0, 4, 4)
+    ) as dst:
+        dst.write(np.full((1, 4, 4), 50.0, dtype=np.float32))
+
+    calculator = GADMIndicatorCalculator(tmp_path / "gadm.gpkg")
+    results = calculator.calculate_all_indicators(
+        ndvi_paths=[inside, outside], zones=make_zones()
+    )
+    assert results['source_file'].unique().tolist() == ["inside.tif"]
+    np.testing.assert_allclose(results['value'], [100.0, 100.0])
+
+    # No zones at all: an empty frame instead of a NaN window
+    empty = calculator.calculate_zonal_statistics(inside, make_zones().iloc[[]])
+    assert empty.empty